@@ -56,6 +56,15 @@ class ArgumentParser(argparse.ArgumentParser):
             help="Make noise.",
         )
 
+        self.add_argument(
+            "--log-format",
+            choices=logging.FORMATS,
+            help=(
+                "How to write logs: `rich` for humans, `logfmt` or `json`\n"
+                "lines for machines, `auto` picks `rich` for terminals."
+            ),
+        )
+
         self.add_argument(
             "-O",
             "--output",
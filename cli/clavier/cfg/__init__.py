@@ -1,4 +1,6 @@
 from __future__ import annotations
+from datetime import timedelta
+from pathlib import Path
 
 from .config import Config
 
@@ -7,3 +9,49 @@ CFG = Config()
 with CFG.configure_root(__package__, src=__file__) as clavier:
     with clavier.configure("log") as log:
         log.level = "WARNING"
+        # See `clavier.log.TFormat`
+        log.format = "auto"
+        with log.configure("queue") as queue:
+            # Render log records on a background thread (`QueuedHandler`)
+            queue.enabled = False
+            queue.capacity = 10_000
+            # What to do when the queue is full: "block" or "drop"
+            queue.policy = "block"
+        with log.configure("sample") as sample:
+            # Per-call-site sampling for records below WARNING: "N/s", "1/K",
+            # "first N" or "none". See `clavier.log.sampling.Policy`
+            sample.default = "none"
+            # Overrides by logger name (closest dotted parent wins), like
+            # `{"stats.cmd.midi.dump": "20/s"}`
+            sample.loggers = {}
+            # Seconds between summaries of suppressed record counts
+            sample.summary_interval = 10.0
+        with log.configure("segments") as segments:
+            # Also keep records in rotating, compressed segment files in `dir`
+            # (see `clavier.log.segments`). Long-running commands can turn
+            # this on for themselves with `clavier.log.add_segment_handler()`
+            segments.enabled = False
+            segments.declare("dir", Path)
+            segments.dir = None
+            segments.level = "INFO"
+            segments.max_bytes = 8 * 1024 * 1024
+            segments.max_age = timedelta(hours=1)
+            segments.retention = timedelta(days=7)
+        with log.configure("rich") as rich:
+            # Rendering budget for each record's data in `RichHandler`. See
+            # `clavier.log.budget.RenderBudget`
+            rich.max_depth = 4
+            rich.max_items = 32
+            rich.max_string = 512
+            rich.max_bytes = 16 * 1024
+    with clavier.configure("sh", "cache") as sh_cache:
+        # Where `clavier.sh.get(..., cache=True)` keeps outputs (see
+        # `clavier.sh_cache.GetCache`). Caching is off while it's `None`
+        sh_cache.declare("dir", Path)
+        sh_cache.dir = None
+        sh_cache.ttl = timedelta(hours=1)
+        sh_cache.max_bytes = 16 * 1024 * 1024
+    with clavier.configure("sh", "batch") as sh_batch:
+        # Default for how many commands a `clavier.sh.Batch` runs at once.
+        # They mostly wait on the commands, so this isn't tied to CPU count
+        sh_batch.max_workers = 8
@@ -0,0 +1,202 @@
+"""Defines `ConfigCache` class."""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+)
+from pathlib import Path
+import os
+import pickle
+# See note in `clavier.log` -- we're imported before logging is set up, so
+# complain through `warnings`
+from warnings import warn
+
+from .key import Key
+
+class ConfigCache:
+    """\
+    Saves the updates made by a block of configure calls to a file, so later
+    runs can re-apply them instead of re-running the block.
+
+    Intended use, in a config source file:
+
+        CACHE = CFG.cache(Path(__file__).parent / ".cfg.pickle")
+
+        if not CACHE.load():
+            with CFG.configure("my_pkg", src=__file__) as my_pkg:
+                ...
+
+            CACHE.dump()
+
+    The cache is only used while it's still at the (resolved) path it was
+    written to -- so a copied checkout doesn't pick up paths from the
+    original -- every `src=` file recorded in the updates' meta has the
+    modification time it had when the cache was written, and every
+    environment variable override for the cached keys has the same value.
+    Otherwise, `load()` returns `False` and you configure like normal.
+
+    Values must be picklable for the cache to be written; if they're not,
+    `dump()` warns and moves on.
+
+    Examples:
+
+        >>> import tempfile
+        >>> from clavier.cfg.config import Config
+        >>> tmp_dir = tempfile.TemporaryDirectory()
+        >>> src = Path(tmp_dir.name) / "cfg.py"
+        >>> src.write_text("# config here")
+        13
+        >>> path = Path(tmp_dir.name) / "cfg.pickle"
+
+        >>> def configure(config):
+        ...     cache = config.cache(path)
+        ...     if not cache.load():
+        ...         print("configuring...")
+        ...         with config.configure("a", src=str(src)) as a:
+        ...             a.b = Path("/b")
+        ...         cache.dump()
+        ...     return config
+
+        >>> configure(Config()).a.b
+        configuring...
+        PosixPath('/b')
+        >>> configure(Config()).a.b
+        PosixPath('/b')
+
+        >>> os.utime(src, ns=(0, 0))
+        >>> configure(Config()).a.b
+        configuring...
+        PosixPath('/b')
+
+        A copy of the cache (as in a copied checkout) is not used:
+
+        >>> import shutil
+        >>> copy_dir = tempfile.TemporaryDirectory()
+        >>> _ = shutil.copy2(path, Path(copy_dir.name) / "cfg.pickle")
+        >>> Config().cache(Path(copy_dir.name) / "cfg.pickle").load()
+        False
+
+        >>> copy_dir.cleanup()
+        >>> tmp_dir.cleanup()
+
+    """
+
+    # Bump when the file layout changes, so old caches are ignored
+    FORMAT = 2
+
+    config: Any
+    path: Path
+    _mark: Optional[int]
+
+    def __init__(self, config, path: Path):
+        self.config = config
+        self.path = Path(path)
+        self._mark = None
+
+    @staticmethod
+    def _mtime(src: str) -> Optional[int]:
+        try:
+            return os.stat(src).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _env_values(updates) -> Dict[str, Optional[str]]:
+        return {
+            Key(key).env_name: os.environ.get(Key(key).env_name)
+            for changes, _meta in updates
+            for key in changes
+        }
+
+    @classmethod
+    def _sources(cls, updates) -> Dict[str, Optional[int]]:
+        return {
+            os.path.realpath(meta["src"]): cls._mtime(meta["src"])
+            for _changes, meta in updates
+            if "src" in meta
+        }
+
+    def _read(self) -> Optional[List]:
+        """\
+        Read the cached updates, returning `None` if there is no cache or it's
+        stale.
+        """
+        # pylint: disable=broad-except
+        try:
+            with self.path.open("rb") as file:
+                data = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as error:
+            warn(f"Failed to read config cache {self.path}: {error}")
+            return None
+
+        if data.get("format") != self.FORMAT:
+            return None
+        if data["path"] != os.path.realpath(self.path):
+            return None
+        if any(
+            self._mtime(src) != mtime for src, mtime in data["sources"].items()
+        ):
+            return None
+        if any(
+            os.environ.get(name) != value
+            for name, value in data["env"].items()
+        ):
+            return None
+        return data["updates"]
+
+    def load(self) -> bool:
+        """\
+        Apply the cached updates to the config if the cache is fresh, returning
+        `True`. Otherwise, returns `False` and starts recording updates for a
+        following `dump()`.
+        """
+        updates = self._read()
+        if updates is None:
+            self._mark = len(self.config._updates)
+            return False
+        for changes, meta in updates:
+            self.config.update(changes, meta)
+        return True
+
+    def dump(self) -> None:
+        """\
+        Write the updates made since `load()` returned `False` to the cache
+        file.
+        """
+        if self._mark is None:
+            raise RuntimeError(
+                "Nothing to dump -- `load()` must be called (and return "
+                "`False`) first"
+            )
+        updates = [
+            (dict(update.changes), dict(update.meta))
+            for update in self.config._updates[self._mark:]
+        ]
+        data = dict(
+            format=self.FORMAT,
+            path=os.path.realpath(self.path),
+            sources=self._sources(updates),
+            env=self._env_values(updates),
+            updates=updates,
+        )
+
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        # pylint: disable=broad-except
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("wb") as file:
+                pickle.dump(data, file)
+            os.replace(tmp_path, self.path)
+        except Exception as error:
+            warn(f"Failed to write config cache {self.path}: {error}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
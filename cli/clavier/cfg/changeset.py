@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from .key import Key
 from .scope import ReadScope, WriteScope
+from .computed import Computed
 
 class Changeset:
     """\
@@ -33,6 +34,9 @@ class Changeset:
         self.prefix = Key(prefix)
         self.meta = meta
         self.changes = {}
+        # Scopes of the keys in `changes`, the same way `Config` tracks its own
+        # -- see `Config.has_scope`
+        self.scopes = set()
         self.write_scope = None
 
     def __contains__(self, key):
@@ -50,9 +54,14 @@ class Changeset:
             return self.config.env_get(key)
 
         # Next, anything already written as a change, as those take priority
-        # over anything previously stored in the `Config`.
+        # over anything previously stored in the `Config`. `Computed` values
+        # are evaluated against the changeset, but not memoized, since it's
+        # still changing.
         if key in self.changes:
-            return self.changes[key]
+            value = self.changes[key]
+            if isinstance(value, Computed):
+                return value.evaluate(self, key)
+            return value
 
         # Then anything already in the config.
         if key in self.config:
@@ -61,16 +70,11 @@ class Changeset:
         # 2.  The exact key doesn't exists, but we may want to return scope,
         #     allowing nested access...
 
-        # If `key` represents a scope we have changes to, ok. Note this this is
-        # only a `ReadScope` for reading values, not a `WriteScope`.
-        for k in self.changes:
-            if key in k.scopes():
-                return ReadScope(base=self, key=key)
-
-        # The config might have a scope for us too
-        for k in self.config:
-            if key in k.scopes():
-                return ReadScope(base=self, key=key)
+        # If `key` represents a scope we have changes to, or the config has
+        # a scope for it, ok. Note this this is only a `ReadScope` for reading
+        # values, not a `WriteScope`.
+        if key in self.scopes or self.config.has_scope(key):
+            return ReadScope(base=self, key=key)
 
         # 3. ...and that's it, nothing more we can do.
         raise KeyError(f"Key not found: {repr(key)}")
@@ -83,6 +87,11 @@ class Changeset:
             )
         # Items are always set in the changes
         self.changes[key] = value
+        self.scopes.update(key.scopes())
+
+    def declare(self, key, typ) -> None:
+        """See `Config.declare`."""
+        self.config.declare(key, typ)
 
     def __enter__(self):
         return WriteScope(base=self, key=self.prefix)
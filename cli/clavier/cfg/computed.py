@@ -0,0 +1,106 @@
+"""\
+Config values that are computed from other values when first read -- see
+`Computed`.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    Set,
+)
+
+from .key import Key
+from .scope import ReadScope
+
+class Computed:
+    """\
+    A config value that is computed -- by calling `fn` with a `ReadScope` of
+    the scope the value is set in -- when it's first read, instead of when the
+    config is built.
+
+    `Config` memoizes the result and records the keys `fn` read, so setting
+    one of those keys (or an environment override of one of them changing)
+    throws the memoized value out and it gets computed again next read.
+
+    Examples:
+
+        >>> from clavier.cfg.config import Config
+        >>> from clavier.cfg.computed import Computed
+        >>> config = Config()
+        >>> def netloc(scope):
+        ...     print("computing netloc...")
+        ...     return f"{scope.host}:{scope.port}"
+        >>> with config.configure("kafka") as kafka:
+        ...     kafka.host = "localhost"
+        ...     kafka.port = 9091
+        ...     kafka.netloc = Computed(netloc)
+        ...     kafka.servers = Computed(lambda kafka: [kafka.netloc])
+        >>> config.kafka.servers
+        computing netloc...
+        ['localhost:9091']
+        >>> config.kafka.netloc
+        'localhost:9091'
+
+    Changing an input invalidates everything downstream of it:
+
+        >>> with config.configure("kafka") as kafka:
+        ...     kafka.port = 9092
+        >>> config.kafka.servers
+        computing netloc...
+        ['localhost:9092']
+
+    Changing something else does not:
+
+        >>> with config.configure("kafka") as kafka:
+        ...     kafka.topic = "events"
+        >>> config.kafka.servers
+        ['localhost:9092']
+
+    Computed values are picklable (see `ConfigCache`) only when `fn` is, so
+    prefer module-level functions to `lambda`s in cached config files.
+    """
+
+    fn: Callable[[ReadScope], Any]
+
+    def __init__(self, fn: Callable[[ReadScope], Any]):
+        self.fn = fn
+
+    def evaluate(self, base, key: Key) -> Any:
+        """\
+        Compute the value for `key`, reading through `base` (a `Config`,
+        `Changeset` or `DependencyTracker`).
+        """
+        return self.fn(ReadScope(base=base, key=key.parent))
+
+    def __repr__(self) -> str:
+        name = getattr(self.fn, "__qualname__", repr(self.fn))
+        return f"{self.__class__.__name__}({name})"
+
+
+class DependencyTracker:
+    """\
+    Read-only stand-in for a `Config` that records every key read through it,
+    including through the nested `ReadScope`s it hands out.
+    """
+
+    keys: Set[Key]
+
+    def __init__(self, config):
+        self.config = config
+        self.keys = set()
+
+    def __contains__(self, key) -> bool:
+        return key in self.config
+
+    def __getitem__(self, key):
+        key = Key(key)
+        self.keys.add(key)
+        value = self.config[key]
+        if isinstance(value, ReadScope):
+            return ReadScope(base=self, key=key)
+        return value
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
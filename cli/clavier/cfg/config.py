@@ -6,24 +6,62 @@ from typing import (
     Union,
     Iterable,
     Sequence,
+    Callable,
 )
 import re
-import os
+import threading
 from functools import reduce
+from warnings import warn
 from sortedcontainers import SortedDict
 
 from .key import Key
 from .scope import ReadScope
 from .changeset import Changeset
+from .env import EnvOverlay
+from .frozen import FrozenConfig
+from .cache import ConfigCache
+from .computed import Computed, DependencyTracker
+from .watcher import ConfigWatcher
+from . import schema
+
+# Stands in for "no value" when comparing watched values
+_MISSING = object()
 
 class Config:
     ENV_VAR_NAME_SUB_RE = re.compile(r"[^A-Z0-9]+")
 
     Update = namedtuple("Update", ["changes", "meta"])
 
+    Provenance = namedtuple(
+        "Provenance", ["key", "value", "update", "env_name"]
+    )
+
     def __init__(self):
         self._view = SortedDict()
+        # Append-only log of applied updates (oldest first), and the index in
+        # it of the update that last set each key
         self._updates = []
+        self._last_update = {}
+        # Every proper prefix of every key in `_view` -- the "scopes" that can
+        # be read through a `ReadScope`. Kept current by `update()`, so telling
+        # a scope from a missing key is a set lookup rather than a scan.
+        self._scopes = set()
+        # Environment value coercers, precompiled per key -- those declared
+        # with `declare()` win over those inferred from values
+        self._declared = {}
+        self._coercers = {}
+        self._env = EnvOverlay(self)
+        self._frozen = None
+        # Memoized `Computed` values, and the computed keys that read each key
+        # (the reverse of their dependencies), for invalidation
+        self._computed = {}
+        self._dependents = {}
+        # `watch()` subscriptions: callbacks and last-seen values by key
+        self._subscribers = {}
+        self._watched_values = {}
+        self._watcher = None
+        # Updates may come from the `ConfigWatcher` thread
+        self._lock = threading.RLock()
 
     def configure(self, *prefix, **meta) -> Changeset:
         return Changeset(config=self, prefix=prefix, meta=meta)
@@ -31,32 +69,105 @@ class Config:
     def configure_root(self, package, **meta) -> Changeset:
         return Changeset(config=self, prefix=Key(package).root, meta=meta)
 
+    def cache(self, path) -> ConfigCache:
+        """\
+        Create a `ConfigCache` that saves configure blocks to `path` so they
+        can be skipped on later runs.
+        """
+        return ConfigCache(self, path)
+
     def env_has(self, key) -> bool:
-        return key in self._view and Key(key).env_name in os.environ
+        return Key(key) in self._env
 
     def env_get(self, key):
-        value_s = os.environ[Key(key).env_name]
-        typ = type(self._view[key])
-        if typ is str:
-            return value_s
-        else:
-            try:
-                return typ(value_s)
-            except Exception:
-                return value_s
+        return self._env[Key(key)]
+
+    def refresh_env(self) -> None:
+        """\
+        Re-read environment variable overrides. Until this is called, the
+        environment is only consulted when a key is set.
+        """
+        with self._lock:
+            affected = self._invalidate(self._env.refresh())
+            self._frozen = None
+            self._notify(affected)
+
+    def declare(self, key, typ) -> None:
+        """\
+        Declare the type of `key`'s value, which decides how environment
+        variable overrides of it are parsed. `typ` may be a type (`int`,
+        `bool`, `Path`, `timedelta`, `List[str]`, ...) or a coercer function.
+        Keys that are not declared go by the type of the value they're set to.
+
+        Examples:
+
+            >>> from typing import List
+            >>> config = Config()
+            >>> config._env.environ = {"A_PORTS": "80, 443", "A_DEBUG": "no"}
+            >>> config.declare("a.ports", List[int])
+            >>> config.update({Key("a.ports"): None, Key("a.debug"): True}, {})
+            >>> config.a.ports, config.a.debug
+            ([80, 443], False)
+
+        Bad values are caught as soon as they're seen:
+
+            >>> config._env.environ = {"A_DEBUG": "sorta"}
+            >>> config.refresh_env()
+            Traceback (most recent call last):
+                ...
+            clavier.err.UserError: Bad value for environment variable $A_DEBUG (config key `a.debug`): Expected one of 0, 1, f, false, n, no, off, on, t, true, y, yes (or empty), given 'sorta'
+
+        """
+        key = Key(key)
+        with self._lock:
+            self._declared[key] = schema.coercer_for_type(typ)
+            self._coercers[key] = self._declared[key]
+            if key in self._view:
+                self._env.add((key,))
+                self._invalidate((key,))
+                self._frozen = None
+
+    def coerce(self, key, value_s: str):
+        """\
+        Convert an environment variable string for `key` with its coercer,
+        raising `clavier.err.UserError` if it doesn't parse.
+        """
+        key = Key(key)
+        return schema.coerce(
+            self._coercers[key], value_s, env_name=key.env_name, key=key
+        )
 
     def __contains__(self, key):
         return Key(key) in self._view
 
+    def has_scope(self, key) -> bool:
+        """\
+        Is `key` a _scope_ of the config -- a proper prefix of one or more keys
+        that have values?
+
+        Examples:
+
+            >>> config = Config()
+            >>> config.update({Key("a.b.c"): 1}, {})
+            >>> config.has_scope("a"), config.has_scope("a.b")
+            (True, True)
+            >>> config.has_scope("a.b.c"), config.has_scope("b")
+            (False, False)
+
+        """
+        return Key(key) in self._scopes
+
     def __getitem__(self, key):
         key = Key(key)
         if self.env_has(key):
             return self.env_get(key)
         if key in self._view:
-            return self._view[key]
-        for k in self._view:
-            if key in k.scopes():
-                return ReadScope(base=self, key=key)
+            value = self._view[key]
+            if isinstance(value, Computed):
+                return self._compute(key, value)
+            return value
+        if key in self._scopes:
+            return ReadScope(base=self, key=key)
         raise KeyError(f"Config has no key or scope {key}")
 
     def __getattr__(self, name):
@@ -71,9 +182,266 @@ class Config:
     def __iter__(self):
         return iter(self._view)
 
+    def _compute(self, key: Key, computed: Computed):
+        if key in self._computed:
+            return self._computed[key]
+        tracker = DependencyTracker(self)
+        value = computed.evaluate(tracker, key)
+        for dependency in tracker.keys:
+            self._dependents.setdefault(dependency, set()).add(key)
+        self._computed[key] = value
+        return value
+
+    def _invalidate(self, keys) -> set:
+        """\
+        Drop memoized `Computed` values for `keys` and everything computed
+        from them, transitively. Returns all the keys affected.
+        """
+        affected = set()
+        pending = list(keys)
+        while pending:
+            key = pending.pop()
+            affected.add(key)
+            self._computed.pop(key, None)
+            pending.extend(self._dependents.pop(key, ()))
+        return affected
+
+    def _watch_value(self, key: Key):
+        value = self[key] if key in self._view else _MISSING
+        return None if isinstance(value, ReadScope) else value
+
+    def _notify_value(self, key: Key):
+        if key in self._view or key in self._scopes:
+            return self[key]
+        return None
+
+    def _notify(self, affected) -> None:
+        keys = set()
+        for key in affected:
+            for scope in (*key.scopes(), key):
+                if scope in self._subscribers:
+                    keys.add(scope)
+
+        for key in keys:
+            # Removed keys (and emptied scopes) notify with `None`
+            value = self._notify_value(key)
+            # Leaf values only notify when they actually changed; scopes
+            # notify on any change under them
+            if not isinstance(value, ReadScope):
+                seen = value if key in self._view else _MISSING
+                if self._watched_values.get(key, _MISSING) == seen:
+                    continue
+                self._watched_values[key] = seen
+            for callback in list(self._subscribers[key]):
+                # pylint: disable=broad-except
+                try:
+                    callback(key, value)
+                except Exception as error:
+                    warn(f"Config watch callback for {key} failed: {error}")
+
+    def watch(
+        self,
+        key,
+        callback: Callable[[Key, Any], None],
+        *,
+        reload: bool = True,
+    ) -> Callable[[], None]:
+        """\
+        Call `callback(key, value)` whenever the value at `key` changes -- or,
+        if `key` is a scope, when anything in it does. If the key is removed
+        (see `reapply`), `value` is `None`. Returns a function that cancels
+        the subscription.
+
+        Unless `reload=False`, also starts a `ConfigWatcher` thread that
+        re-runs config source files when they change, so edits take effect in
+        long-running processes. Callbacks then run _on that thread_.
+
+        Examples:
+
+            >>> config = Config()
+            >>> config.update({Key("a.b"): 1, Key("a.c"): 2}, {})
+            >>> unwatch = config.watch(
+            ...     "a.b",
+            ...     lambda key, value: print(f"{key} -> {value}"),
+            ...     reload=False,
+            ... )
+            >>> config.update({Key("a.b"): 10}, {})
+            a.b -> 10
+            >>> config.update({Key("a.b"): 10, Key("a.c"): 20}, {})
+            >>> unwatch()
+            >>> config.update({Key("a.b"): 100}, {})
+
+        """
+        key = Key(key)
+        with self._lock:
+            if key not in self._subscribers:
+                self._subscribers[key] = []
+                self._watched_values[key] = self._watch_value(key)
+            self._subscribers[key].append(callback)
+            if reload and self._watcher is None:
+                self._watcher = ConfigWatcher(self)
+                self._watcher.start()
+
+        def unwatch():
+            with self._lock:
+                callbacks = self._subscribers.get(key, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+                if not callbacks:
+                    self._subscribers.pop(key, None)
+                    self._watched_values.pop(key, None)
+
+        return unwatch
+
     def update(self, changes, meta) -> None:
-        self._view.update(changes)
-        self._updates.insert(0, self.Update({**changes}, {**meta}))
+        with self._lock:
+            self._view.update(changes)
+            for key, value in changes.items():
+                self._scopes.update(key.scopes())
+                if key not in self._declared:
+                    self._coercers[key] = schema.coercer_for_value(value)
+            self._env.add(changes)
+            affected = self._invalidate(changes)
+            self._frozen = None
+            # The log takes ownership of `changes` and `meta` -- don't mutate
+            # them after handing them over
+            index = len(self._updates)
+            self._updates.append(self.Update(changes, meta))
+            for key in changes:
+                self._last_update[key] = index
+            self._notify(affected)
+
+    def _src_keys(self, src, start: int = 0, stop: Optional[int] = None) -> set:
+        return {
+            key
+            for update in self._updates[start:stop]
+            if update.meta.get("src") == src
+            for key in update.changes
+        }
+
+    def reapply(self, src, apply: Callable[[], Any]) -> None:
+        """\
+        Re-run the configure blocks of source file `src` by calling `apply`,
+        then remove the keys `src` set before but didn't set this time. Where
+        another source had set one of those keys, its value comes back.
+
+        Used by `ConfigWatcher` when a source file changes. If `apply` raises,
+        nothing is removed.
+
+        Examples:
+
+            >>> config = Config()
+            >>> config.update({Key("a.b"): 1}, {"src": "base.py"})
+            >>> config.update({Key("a.b"): 2, Key("a.c"): 3}, {"src": "app.py"})
+            >>> unwatch = config.watch(
+            ...     "a.c",
+            ...     lambda key, value: print(f"{key} -> {value}"),
+            ...     reload=False,
+            ... )
+            >>> config.reapply(
+            ...     "app.py",
+            ...     lambda: config.update({Key("a.d"): 4}, {"src": "app.py"}),
+            ... )
+            a.c -> None
+            >>> config.to_dict()
+            {'a.b': 1, 'a.d': 4}
+            >>> config.provenance("a.b").update.meta["src"]
+            'base.py'
+
+        """
+        with self._lock:
+            start = len(self._updates)
+            old_keys = self._src_keys(src, stop=start)
+            apply()
+            stale = {
+                key
+                for key in old_keys - self._src_keys(src, start=start)
+                if key in self._last_update
+                and self._updates[self._last_update[key]].meta.get("src")
+                == src
+            }
+            if stale:
+                self._remove(stale, src)
+
+    def _remove(self, keys, src) -> None:
+        """\
+        Drop `keys`, as last set by `src`, falling back to the latest value
+        from any other source.
+        """
+        removed = []
+        for key in keys:
+            fallback = next(
+                (
+                    index
+                    for index in range(self._last_update[key] - 1, -1, -1)
+                    if key in self._updates[index].changes
+                    and self._updates[index].meta.get("src") != src
+                ),
+                None,
+            )
+            if fallback is None:
+                del self._view[key]
+                del self._last_update[key]
+                if key not in self._declared:
+                    self._coercers.pop(key, None)
+                removed.append(key)
+            else:
+                value = self._updates[fallback].changes[key]
+                self._view[key] = value
+                self._last_update[key] = fallback
+                if key not in self._declared:
+                    self._coercers[key] = schema.coercer_for_value(value)
+                self._env.add((key,))
+        self._env.discard(removed)
+        self._scopes = {
+            scope for key in self._view for scope in key.scopes()
+        }
+        affected = self._invalidate(keys)
+        self._frozen = None
+        self._notify(affected)
+
+    def provenance(self, key) -> Provenance:
+        """\
+        Where does the value for `key` come from? Returns the current value,
+        the `Update` that last set it and, if an environment variable is
+        overriding it, that variable's name.
+
+        Examples:
+
+            >>> config = Config()
+            >>> config.update({Key("a.b"): 1}, {"src": "one.py"})
+            >>> config.update({Key("a.b"): 2}, {"src": "two.py"})
+            >>> config.update({Key("a.c"): 3}, {"src": "three.py"})
+            >>> prov = config.provenance("a.b")
+            >>> prov.value, prov.update.meta["src"], prov.env_name
+            (2, 'two.py', None)
+
+        """
+        key = Key(key)
+        if key not in self._last_update:
+            raise KeyError(f"Config has no key {key}")
+        return self.Provenance(
+            key=key,
+            value=self[key],
+            update=self._updates[self._last_update[key]],
+            env_name=(key.env_name if self.env_has(key) else None),
+        )
+
+    def freeze(self) -> FrozenConfig:
+        """\
+        Get an immutable snapshot of the config, where scopes are pre-built
+        objects and reading a value is plain attribute access. The snapshot is
+        re-used until the config is updated. See `FrozenConfig`.
+        """
+        if self._frozen is None:
+            self._frozen = FrozenConfig.build(
+                {key: self[key] for key in self._view}
+            )
+        return self._frozen
 
     def to_dict(self):
         return {str(key): self[key] for key in self._view}
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,133 @@
+"""Defines `EnvOverlay` class."""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+)
+import os
+from warnings import warn
+
+from .key import Key
+
+class EnvOverlay:
+    """\
+    The environment variable overrides for a `Config`, worked out ahead of
+    time.
+
+    Each key's `Key.env_name` is computed once, when the key is first added,
+    and the environment is only probed -- and the value coerced -- when a key
+    is added or the overlay is `refresh()`-ed (`Sesh.setup` does that). Reads
+    are then just `dict` lookups.
+
+    Examples:
+
+        >>> from clavier.cfg.config import Config
+        >>> config = Config()
+        >>> config._env.environ = {"A_B": "2"}
+        >>> config.update({Key("a.b"): 1, Key("a.c"): 1}, {})
+        >>> config.a.b, config.a.c
+        (2, 1)
+
+    The overlay does not see environment changes until refreshed:
+
+        >>> config._env.environ = {"A_C": "3"}
+        >>> config.a.b
+        2
+        >>> config.refresh_env()
+        >>> config.a.b, config.a.c
+        (1, 3)
+
+    Keys that map to the same environment variable name get a warning (and
+    both take the override):
+
+        >>> import warnings
+        >>> with warnings.catch_warnings(record=True) as caught:
+        ...     warnings.simplefilter("always")
+        ...     config.update({Key("a_c"): 0}, {})
+        >>> print(caught[0].message)
+        Config keys a.c and a_c share environment variable name A_C
+        >>> config.a_c
+        3
+
+    """
+
+    _config: Any
+    _keys_by_name: Dict[str, List[Key]]
+    _values: Dict[Key, Any]
+
+    # Where values come from. Swappable for testing; `None` means `os.environ`
+    environ: Optional[Mapping[str, str]] = None
+
+    def __init__(self, config):
+        self._config = config
+        self._keys_by_name = {}
+        self._values = {}
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._values
+
+    def __getitem__(self, key: Key) -> Any:
+        return self._values[key]
+
+    def _environ(self) -> Mapping[str, str]:
+        return os.environ if self.environ is None else self.environ
+
+    def _load(self, key: Key, environ: Mapping[str, str]) -> bool:
+        """Load the value for `key`, returning if it changed."""
+        value_s = environ.get(key.env_name)
+        had_value = key in self._values
+        old_value = self._values.get(key)
+        if value_s is None:
+            self._values.pop(key, None)
+            return had_value
+        value = self._config.coerce(key, value_s)
+        self._values[key] = value
+        return not had_value or old_value != value
+
+    def add(self, keys: Iterable[Key]) -> None:
+        """\
+        Pick up `keys` that have been set in the config, (re-)loading their
+        environment values (the value type may have changed).
+        """
+        environ = self._environ()
+        for key in keys:
+            name = key.env_name
+            keys_for_name = self._keys_by_name.setdefault(name, [])
+            if key not in keys_for_name:
+                if keys_for_name:
+                    warn(
+                        f"Config keys {', '.join(map(str, keys_for_name))} "
+                        f"and {key} share environment variable name {name}"
+                    )
+                keys_for_name.append(key)
+            self._load(key, environ)
+
+    def discard(self, keys: Iterable[Key]) -> None:
+        """Forget `keys` that have been removed from the config."""
+        for key in keys:
+            self._values.pop(key, None)
+            keys_for_name = self._keys_by_name.get(key.env_name, [])
+            if key in keys_for_name:
+                keys_for_name.remove(key)
+                if not keys_for_name:
+                    del self._keys_by_name[key.env_name]
+
+    def refresh(self) -> Set[Key]:
+        """Re-read the environment for all keys, returning those that changed."""
+        environ = self._environ()
+        return {
+            key
+            for keys in self._keys_by_name.values()
+            for key in keys
+            if self._load(key, environ)
+        }
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
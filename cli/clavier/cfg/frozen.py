@@ -0,0 +1,192 @@
+"""\
+Immutable, pre-built snapshots of a `Config` -- see `Config.freeze()`.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    Set,
+    Type,
+    TypeVar,
+    cast,
+)
+
+from .key import Key
+
+TFrozenScope = TypeVar("TFrozenScope", bound="FrozenScope")
+
+class FrozenScope:
+    """\
+    A scope of a `FrozenConfig`.
+
+    Each distinct scope gets its own subclass with a `__slots__` entry per
+    child name, populated once when the snapshot is built, so reading a value
+    is a plain attribute access. Nothing can be assigned afterwards.
+
+    Children named like attributes of the class (`to_dict`, `_key`, ...) would
+    shadow them, so they're kept aside instead, and only reachable with `[]`.
+    """
+
+    __slots__ = ("_key", "_escaped")
+
+    _key: Key
+    _escaped: Dict[str, Any]
+
+    @classmethod
+    def create(
+        cls: Type[TFrozenScope], key: Key, children: Dict[str, Any]
+    ) -> TFrozenScope:
+        attrs = {
+            name: value
+            for name, value in children.items()
+            if not hasattr(cls, name)
+        }
+        scope_class = cast(
+            Type[TFrozenScope],
+            type(cls.__name__, (cls,), {"__slots__": tuple(attrs)}),
+        )
+        scope = object.__new__(scope_class)
+        object.__setattr__(scope, "_key", key)
+        object.__setattr__(
+            scope,
+            "_escaped",
+            {
+                name: value
+                for name, value in children.items()
+                if name not in attrs
+            },
+        )
+        for name, value in attrs.items():
+            object.__setattr__(scope, name, value)
+        return scope
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            f"Can not set {repr(name)}, frozen config scopes are read-only"
+        )
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(
+            f"Can not delete {repr(name)}, frozen config scopes are read-only"
+        )
+
+    def __iter__(self):
+        return iter((*self.__slots__, *self._escaped))
+
+    def _child(self, name: str) -> Any:
+        if name in self._escaped:
+            return self._escaped[name]
+        if name in type(self).__slots__:
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, name):
+        value = self
+        for segment in Key(name):
+            try:
+                value = value._child(segment)
+            except AttributeError:
+                raise KeyError(
+                    f"Frozen config has no key or scope {Key(self._key, name)}"
+                ) from None
+        return value
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} {self._key}>"
+
+
+class FrozenConfig(FrozenScope):
+    """\
+    Root of an immutable `Config` snapshot. Values (with environment overrides
+    applied) also sit in a flat `dict` by full `Key`, so lookups like
+    `frozen["a.b.c"]` skip the scope walk.
+
+    Examples:
+
+        >>> from clavier.cfg.config import Config
+        >>> config = Config()
+        >>> config.update({Key("a.b.c"): 1, Key("a.d"): "dee"}, {})
+        >>> frozen = config.freeze()
+        >>> frozen.a.b.c, frozen.a.d, frozen["a.b.c"]
+        (1, 'dee', 1)
+
+    Scope objects are built once and shared:
+
+        >>> frozen.a.b is frozen.a.b is frozen["a.b"]
+        True
+
+    And nothing can be changed:
+
+        >>> frozen.a.d = "dah"
+        Traceback (most recent call last):
+            ...
+        AttributeError: Can not set 'd', frozen config scopes are read-only
+
+    `Config.freeze()` hands back the same snapshot until the config changes:
+
+        >>> config.freeze() is frozen
+        True
+        >>> config.update({Key("a.d"): "dah"}, {})
+        >>> config.freeze() is frozen, config.freeze().a.d
+        (False, 'dah')
+
+    Keys named like methods don't hide them, and are read with `[]`:
+
+        >>> config.update({Key("a.to_dict"): 1, Key("to_dict"): 2}, {})
+        >>> frozen = config.freeze()
+        >>> frozen["a.to_dict"], frozen.a["to_dict"], frozen["to_dict"]
+        (1, 1, 2)
+        >>> sorted(frozen.to_dict())
+        ['a.b.c', 'a.d', 'a.to_dict', 'to_dict']
+
+    """
+
+    __slots__ = ("_values",)
+
+    _values: Dict[Key, Any]
+
+    @classmethod
+    def build(cls, values: Dict[Key, Any]) -> FrozenConfig:
+        # Child names for every scope, including the root (empty) one
+        children: Dict[Key, Set[str]] = {Key(): set()}
+        for key in values:
+            for scope in (Key(), *key.scopes()):
+                children.setdefault(scope, set()).add(key[len(scope)])
+
+        # Build the scopes deepest-first, so each one's child scopes are
+        # ready when it's created. Like `Config`, values win over scopes.
+        scopes: Dict[Key, FrozenScope] = {}
+        for scope in sorted(children, key=len, reverse=True):
+            members = {}
+            for name in sorted(children[scope]):
+                key = Key(scope, name)
+                members[name] = values[key] if key in values else scopes[key]
+            if scope:
+                scopes[scope] = FrozenScope.create(scope, members)
+        root = cls.create(Key(), members)
+        object.__setattr__(root, "_values", values)
+        return root
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, key):
+        key = Key(key)
+        if key in self._values:
+            return self._values[key]
+        return super().__getitem__(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {str(key): value for key, value in self._values.items()}
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import Generator, Iterable
+from functools import lru_cache
 import re
+import sys
 
 class Key(tuple):
     """
@@ -36,11 +38,25 @@ class Key(tuple):
             ...
         ValueError: Each segment in a `key` must full-match [A-Za-z][A-Za-z0-9_]*, found '' in 'a..b'
 
+    Construction is memoized -- the same arguments give back the very same
+    (immutable) `Key`, without splitting and matching segments again:
+
+        >>> Key("a.b") is Key("a.b")
+        True
+        >>> Key("a.b") is Key("a", "b")
+        False
+        >>> Key("a.b") == Key("a", "b")
+        True
+
     """
 
     STRING_SEPARATOR = "."
     SEGMENT_FORMAT = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
 
+    # How many distinct constructor argument tuples to remember. See
+    # `Key.cache_info()` for the hit/miss counts to size it against.
+    CACHE_SIZE = 4096
+
     @classmethod
     def is_segment(cls, x) -> bool:
         if isinstance(x, str) and cls.SEGMENT_FORMAT.fullmatch(x):
@@ -51,7 +67,7 @@ class Key(tuple):
     def normalize(cls, value):
         for segment in cls.split(value):
             if cls.is_segment(segment):
-                yield segment
+                yield sys.intern(segment)
             else:
                 raise ValueError(
                     "Each segment in a `key` must full-match "
@@ -121,10 +137,33 @@ class Key(tuple):
                 f"given {type(value)}: {repr(value)}"
             )
 
-    def __new__(self, *values):
-        if len(values) == 1 and isinstance(values[0], self.__class__):
+    @staticmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _interned(values: tuple) -> Key:
+        return tuple.__new__(Key, Key.normalize(values))
+
+    @classmethod
+    def cache_info(cls):
+        """\
+        Hit, miss and size counts for the `Key` construction cache, as a
+        `functools.lru_cache` `CacheInfo`.
+        """
+        return cls._interned.cache_info()
+
+    @classmethod
+    def cache_clear(cls) -> None:
+        cls._interned.cache_clear()
+
+    def __new__(cls, *values):
+        if len(values) == 1 and isinstance(values[0], cls):
             return values[0]
-        return tuple.__new__(Key, self.normalize(values))
+        try:
+            hash(values)
+        except TypeError:
+            # Something un-hashable in there (a `list`, say), so we can't
+            # cache it; just normalize it every time.
+            return tuple.__new__(cls, cls.normalize(values))
+        return cls._interned(values)
 
     @property
     def env_name(self):
@@ -151,7 +190,8 @@ class Key(tuple):
             ...   == Key("clavier", "some_setting").env_name )
             True
 
-        Only _you_ can prevent environment variable name collisions!
+        Only _you_ can prevent environment variable name collisions! (`Config`
+        will at least warn you about them -- see `EnvOverlay`.)
         """
         return "_".join(self).upper()
 
@@ -170,7 +210,25 @@ class Key(tuple):
         """
         if self.is_empty():
             raise IndexError("The empty Key has no root")
-        return self.__class__(self[0])
+        return tuple.__new__(self.__class__, self[0:1])
+
+    @property
+    def parent(self) -> Key:
+        """\
+        Get the key of the scope this key is in.
+
+        Examples:
+
+            >>> Key("a.b.c").parent
+            Key('a', 'b')
+
+            >>> Key("a").parent
+            Key()
+
+        """
+        if self.is_empty():
+            raise IndexError("The empty Key has no parent")
+        return tuple.__new__(self.__class__, self[0:-1])
 
     def __repr__(self) -> str:
         """\
@@ -241,8 +299,9 @@ class Key(tuple):
             True
 
         """
+        # Segments are already normalized, so we can skip right to the tuple
         for stop in range(1, len(self)):
-            yield Key(self[0:stop])
+            yield tuple.__new__(Key, self[0:stop])
 
 if __name__ == '__main__':
     from pathlib import Path
@@ -0,0 +1,264 @@
+"""\
+Coercers that turn environment variable strings into typed config values.
+
+`Config` picks one per key, once -- either from a type declared with
+`Config.declare()` or from the type of the value the key is set to -- so
+overrides are parsed (and rejected) at startup instead of on every read.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    get_args,
+    get_origin,
+)
+from datetime import timedelta
+from pathlib import Path, PurePath
+import re
+
+from ..err import UserError
+
+TCoercer = Callable[[str], Any]
+
+TRUE_STRINGS = frozenset(("1", "true", "t", "yes", "y", "on"))
+FALSE_STRINGS = frozenset(("0", "false", "f", "no", "n", "off", ""))
+
+LIST_SEPARATOR = ","
+MAPPING_ITEM_SEPARATOR = "="
+
+DURATION_UNITS = dict(
+    ms=timedelta(milliseconds=1),
+    s=timedelta(seconds=1),
+    m=timedelta(minutes=1),
+    h=timedelta(hours=1),
+    d=timedelta(days=1),
+)
+DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h|d)")
+DURATION_RE = re.compile(rf"(?:{DURATION_PART_RE.pattern})+")
+
+
+def coerce_str(value_s: str) -> str:
+    return value_s
+
+
+def coerce_bool(value_s: str) -> bool:
+    """\
+    Examples:
+
+        >>> coerce_bool("yes"), coerce_bool("OFF"), coerce_bool("1")
+        (True, False, True)
+
+        >>> coerce_bool("maybe")
+        Traceback (most recent call last):
+            ...
+        ValueError: Expected one of 0, 1, f, false, n, no, off, on, t, true, y, yes (or empty), given 'maybe'
+
+    """
+    lowered = value_s.strip().lower()
+    if lowered in TRUE_STRINGS:
+        return True
+    if lowered in FALSE_STRINGS:
+        return False
+    known = ", ".join(sorted(s for s in TRUE_STRINGS | FALSE_STRINGS if s))
+    raise ValueError(f"Expected one of {known} (or empty), given {value_s!r}")
+
+
+def coerce_path(value_s: str) -> Path:
+    """\
+    Examples:
+
+        >>> coerce_path("/a/b")
+        PosixPath('/a/b')
+
+    """
+    return Path(value_s).expanduser()
+
+
+def coerce_duration(value_s: str) -> timedelta:
+    """\
+    Parse things like `"250ms"`, `"1.5s"` or `"1h30m"`. Bare numbers are
+    seconds.
+
+    Examples:
+
+        >>> coerce_duration("1h30m")
+        datetime.timedelta(seconds=5400)
+        >>> coerce_duration("250ms")
+        datetime.timedelta(microseconds=250000)
+        >>> coerce_duration("2")
+        datetime.timedelta(seconds=2)
+
+        >>> coerce_duration("soon")
+        Traceback (most recent call last):
+            ...
+        ValueError: Expected a duration like '1.5s', '250ms' or '1h30m', given 'soon'
+
+    """
+    compact = value_s.strip().replace(" ", "")
+    try:
+        return timedelta(seconds=float(compact))
+    except ValueError:
+        pass
+    if not DURATION_RE.fullmatch(compact):
+        raise ValueError(
+            "Expected a duration like '1.5s', '250ms' or '1h30m', given "
+            f"{value_s!r}"
+        )
+    return sum(
+        (
+            DURATION_UNITS[unit] * float(amount)
+            for amount, unit in DURATION_PART_RE.findall(compact)
+        ),
+        timedelta(),
+    )
+
+
+def list_coercer(item_coercer: TCoercer = coerce_str) -> TCoercer:
+    """\
+    Make a coercer for comma-separated lists.
+
+    Examples:
+
+        >>> list_coercer(int)("1, 2,3")
+        [1, 2, 3]
+        >>> list_coercer()("")
+        []
+
+    """
+
+    def coerce_list(value_s: str) -> List:
+        return [
+            item_coercer(item.strip())
+            for item in value_s.split(LIST_SEPARATOR)
+            if item.strip()
+        ]
+
+    return coerce_list
+
+
+def mapping_coercer(value_coercer: TCoercer = coerce_str) -> TCoercer:
+    """\
+    Make a coercer for comma-separated `name=value` mappings.
+
+    Examples:
+
+        >>> mapping_coercer(int)("a=1, b.c=2")
+        {'a': 1, 'b.c': 2}
+        >>> mapping_coercer()("")
+        {}
+
+        >>> mapping_coercer()("a")
+        Traceback (most recent call last):
+            ...
+        ValueError: Expected `name=value` items, given 'a'
+
+    """
+
+    def coerce_mapping(value_s: str) -> Dict[str, Any]:
+        mapping = {}
+        for item in value_s.split(LIST_SEPARATOR):
+            if not item.strip():
+                continue
+            name, sep, value = item.partition(MAPPING_ITEM_SEPARATOR)
+            if not sep or not name.strip():
+                raise ValueError(
+                    f"Expected `name{MAPPING_ITEM_SEPARATOR}value` items, "
+                    f"given {item.strip()!r}"
+                )
+            mapping[name.strip()] = value_coercer(value.strip())
+        return mapping
+
+    return coerce_mapping
+
+
+def coercer_for_type(typ: Any) -> TCoercer:
+    """\
+    Get the coercer for a type, which may be a `typing` generic like
+    `List[int]`.
+
+    Examples:
+
+        >>> coercer_for_type(List[int])("1,2")
+        [1, 2]
+        >>> coercer_for_type(bool)("no")
+        False
+
+    """
+    origin = get_origin(typ)
+    if origin in (list, tuple, List):
+        args = get_args(typ)
+        return list_coercer(coercer_for_type(args[0]) if args else coerce_str)
+    if origin in (dict, Dict):
+        args = get_args(typ)
+        return mapping_coercer(
+            coercer_for_type(args[1]) if args else coerce_str
+        )
+    if typ in (list, tuple):
+        return list_coercer()
+    if typ is dict:
+        return mapping_coercer()
+    if typ is bool:
+        return coerce_bool
+    if typ is str:
+        return coerce_str
+    if typ is timedelta:
+        return coerce_duration
+    if isinstance(typ, type) and issubclass(typ, PurePath):
+        return coerce_path
+    if callable(typ):
+        return typ
+    raise TypeError(f"Can't make a config coercer for {typ!r}")
+
+
+def coercer_for_value(value: Any) -> TCoercer:
+    """\
+    Infer the coercer from an example value, looking at the first item for
+    lists and mappings.
+
+    Examples:
+
+        >>> coercer_for_value([8080])("80, 443")
+        [80, 443]
+        >>> coercer_for_value(Path("/tmp"))("~")
+        PosixPath('...')
+        >>> coercer_for_value({"a": 1})("b=2")
+        {'b': 2}
+
+    """
+    if isinstance(value, dict):
+        return mapping_coercer(
+            coercer_for_value(next(iter(value.values())))
+            if value
+            else coerce_str
+        )
+    if isinstance(value, (list, tuple)):
+        return list_coercer(
+            coercer_for_value(value[0]) if value else coerce_str
+        )
+    if isinstance(value, (bool, str, timedelta, PurePath, int, float)):
+        return coercer_for_type(
+            PurePath if isinstance(value, PurePath) else type(value)
+        )
+    # Anything else (`Computed` values, etc.) we can't say much about
+    return coerce_str
+
+
+def coerce(coercer: TCoercer, value_s: str, *, env_name: str, key: Any):
+    """\
+    Run `coercer`, turning failures into a `UserError` that tells the user
+    which environment variable is wrong.
+    """
+    try:
+        return coercer(value_s)
+    except (TypeError, ValueError) as error:
+        raise UserError(
+            f"Bad value for environment variable ${env_name} "
+            f"(config key `{key}`): {error}"
+        ) from error
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.ELLIPSIS)
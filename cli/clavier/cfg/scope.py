@@ -38,5 +38,11 @@ class WriteScope(ReadScope):
     def __exit__(self, exc_type, exc_value, traceback) -> None:
         pass
 
+    def declare(self, name: str, typ: Any) -> None:
+        """\
+        Declare the type of a value in this scope -- see `Config.declare`.
+        """
+        self._base.declare(Key(self._key, name), typ)
+
     def configure(self, *key: str, **meta):
         return self.__class__(base=self._base, key=Key(self._key, key))
@@ -0,0 +1,109 @@
+"""Defines `ConfigWatcher` class."""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    Optional,
+)
+import importlib
+import os
+import runpy
+import sys
+import threading
+from types import ModuleType
+from warnings import warn
+
+class ConfigWatcher(threading.Thread):
+    """\
+    A background (daemon) thread that polls the `src=` files recorded in a
+    `Config`'s update meta and, when one changes, re-runs it -- reloading the
+    module if it has been imported, otherwise running it as a script -- so the
+    config picks up the new values and notifies `Config.watch()` subscribers.
+    Keys the file no longer sets are removed (see `Config.reapply`).
+
+    Modules of `clavier.cfg` itself are never reloaded: that would replace
+    `CFG` (and the `Config` class) out from under everyone holding them.
+    Changes to them are warned about, and need a restart.
+
+    You don't usually create these yourself; `Config.watch()` starts one.
+    """
+
+    DEFAULT_INTERVAL = 1.0
+
+    config: Any
+    interval: float
+    _mtimes: Dict[str, Optional[int]]
+    _stop_event: threading.Event
+
+    def __init__(self, config, interval: float = DEFAULT_INTERVAL):
+        super().__init__(name="clavier.cfg.ConfigWatcher", daemon=True)
+        self.config = config
+        self.interval = interval
+        self._mtimes = {}
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _mtime(src: str) -> Optional[int]:
+        try:
+            return os.stat(src).st_mtime_ns
+        except OSError:
+            return None
+
+    def _srcs(self):
+        return {
+            update.meta["src"]
+            for update in list(self.config._updates)
+            if "src" in update.meta
+        }
+
+    def poll(self) -> None:
+        """Check the source files once, re-running any that changed."""
+        for src in sorted(self._srcs()):
+            mtime = self._mtime(src)
+            if src not in self._mtimes:
+                self._mtimes[src] = mtime
+            elif self._mtimes[src] != mtime:
+                self._mtimes[src] = mtime
+                self.rerun(src)
+
+    @staticmethod
+    def _module_for(src: str) -> Optional[ModuleType]:
+        for module in list(sys.modules.values()):
+            if getattr(module, "__file__", None) == src:
+                return module
+        return None
+
+    @staticmethod
+    def _is_config_package(module: ModuleType) -> bool:
+        name = module.__name__
+        return name == __package__ or name.startswith(f"{__package__}.")
+
+    def rerun(self, src: str) -> None:
+        module = self._module_for(src)
+        if module is not None and self._is_config_package(module):
+            warn(
+                f"Not reloading config source {src}, which is part of "
+                f"`{__package__}` -- restart to pick up the changes"
+            )
+            return
+
+        def apply():
+            if module is None:
+                runpy.run_path(src)
+            else:
+                importlib.reload(module)
+
+        # pylint: disable=broad-except
+        try:
+            self.config.reapply(src, apply)
+        except Exception as error:
+            warn(f"Failed to reload config source {src}: {error}")
+
+    def run(self) -> None:
+        self.poll()
+        while not self._stop_event.wait(self.interval):
+            self.poll()
+
+    def stop(self) -> None:
+        self._stop_event.set()
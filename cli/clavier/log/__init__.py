@@ -14,11 +14,17 @@ from typing import (
 # warning system to go through logging, so it might still explode...)
 from warnings import warn
 
-from .. import txt, err
+from .. import txt, err, io
 from clavier.cfg import CFG
 from .kwds_logger import KwdsLogger
 from .log_getter import LogGetter
 from .rich_handler import RichHandler
+from .structured_handler import StructuredHandler
+from .queued_handler import QueuedHandler
+from .lazy import Lazy
+from .sampling import SamplingFilter
+from .segments import SegmentHandler
+from .budget import RenderBudget
 
 # Stdlib's `logging` level values, which are integers.
 TLevel = Literal[
@@ -55,6 +61,21 @@ TLevelName = Literal[
 #
 TLevelValue = Union[TLevel, TLevelStr, TLevelName]
 
+# How to write log records to the console:
+#
+# 1.  `rich` -- pretty, for humans, via `RichHandler`.
+# 2.  `logfmt` and `json` -- one line per record, cheap, via
+#     `StructuredHandler`.
+# 3.  `auto` -- `rich` if `stderr` is a terminal, otherwise `logfmt`.
+#
+TFormat = Literal["auto", "rich", "logfmt", "json"]
+
+FORMATS = ("auto", "rich", "logfmt", "json")
+
+# Samples (and rate-limits) records on the console handler, per call site. See
+# `configure_sampling`.
+SAMPLER = SamplingFilter()
+
 # Valid _verbose_ switch values, provided like `-v` (1), `-vv` (2), etc.
 TVerbosity = Literal[0, 1, 2, 3]
 
@@ -219,12 +240,164 @@ def set_level(
             )
 
 
-def setup(module_name: str, level: TLevelValue = DEFAULT_PKG_LEVEL) -> None:
+def console_handler_for(format: TFormat) -> logging.Handler:
+    """\
+    Get the handler that writes to the console in a `TFormat`.
+    """
+    # pylint: disable=redefined-builtin
+    if format == "auto":
+        format = "rich" if io.ERR.is_terminal else "logfmt"
+    if format == "rich":
+        handler = RichHandler.singleton()
+        rich = CFG.clavier.log.rich
+        handler.budget = RenderBudget(
+            max_depth=rich.max_depth,
+            max_items=rich.max_items,
+            max_string=rich.max_string,
+            max_bytes=rich.max_bytes,
+        )
+        return handler
+    if format in ("logfmt", "json"):
+        return StructuredHandler.singleton(format)
+    raise ValueError(
+        f"Unknown log format {repr(format)}; known formats are "
+        f"{txt.coordinate(FORMATS, 'and')}"
+    )
+
+
+# The handler `set_format` last put on the loggers, for `flush_console`
+_console_handler: Optional[logging.Handler] = None
+
+
+def set_format(
+    module_name: str,
+    format: TFormat,
+    *,
+    queued: Optional[bool] = None,
+) -> None:
+    """\
+    Switch the console handler on the lib and package loggers to the one for
+    `format`.
+
+    When `queued` is `True` the handler is wrapped in a `QueuedHandler`, so
+    records are rendered on a background thread. `None` means use the
+    `clavier.log.queue.enabled` config value.
+    """
+    # pylint: disable=redefined-builtin,global-statement
+    global _console_handler
+    if queued is None:
+        queued = CFG.clavier.log.queue.enabled
+    handler = console_handler_for(format)
+    if queued:
+        handler = QueuedHandler(
+            handler,
+            capacity=CFG.clavier.log.queue.capacity,
+            policy=CFG.clavier.log.queue.policy,
+        )
+    # On the outermost handler, so suppressed records are never queued
+    handler.addFilter(SAMPLER)
+    for logger in (get_lib_logger(), get_pkg_logger(module_name)):
+        for existing in list(logger.handlers):
+            if isinstance(
+                existing, (RichHandler, StructuredHandler, QueuedHandler)
+            ):
+                logger.removeHandler(existing)
+                if isinstance(existing, QueuedHandler):
+                    existing.close()
+        logger.addHandler(handler)
+    _console_handler = handler
+
+
+_segment_handler: Optional[SegmentHandler] = None
+
+
+def segment_handler() -> SegmentHandler:
+    """\
+    The `SegmentHandler` for the `clavier.log.segments` config, created on
+    first use.
+    """
+    global _segment_handler  # pylint: disable=global-statement
+    if _segment_handler is None:
+        segments = CFG.clavier.log.segments
+        if segments.dir is None:
+            raise err.UserError(
+                "Log segments need a directory; set `clavier.log.segments.dir`"
+            )
+        _segment_handler = SegmentHandler(
+            segments.dir,
+            level_for(segments.level),
+            max_bytes=segments.max_bytes,
+            max_age=segments.max_age,
+            retention=segments.retention,
+        )
+    return _segment_handler
+
+
+def add_handler(module_name: str, handler: logging.Handler) -> None:
+    """\
+    Add a handler -- alongside the console one -- to the lib and package
+    loggers.
+    """
+    for logger in (get_lib_logger(), get_pkg_logger(module_name)):
+        logger.addHandler(handler)
+
+
+def add_segment_handler(module_name: str) -> SegmentHandler:
+    """\
+    Start keeping the lib and package logs in segment files as well (see
+    `clavier.log.segments`).
+    """
+    handler = segment_handler()
+    add_handler(module_name, handler)
+    return handler
+
+
+def configure_sampling() -> None:
+    """\
+    (Re-)configure `SAMPLER` from the `clavier.log.sample` config.
+    """
+    sample = CFG.clavier.log.sample
+    SAMPLER.configure(
+        default=sample.default,
+        loggers=sample.loggers,
+        summary_interval=sample.summary_interval,
+    )
+
+
+def flush(module_name: str) -> None:
+    """\
+    Flush the handlers on the lib and package loggers, which -- for a
+    `QueuedHandler` -- waits for the queued records to be written. Counts of
+    records suppressed by `SAMPLER` are logged first.
+    """
+    SAMPLER.summarize()
+    for logger in (get_lib_logger(), get_pkg_logger(module_name)):
+        for handler in logger.handlers:
+            handler.flush()
+
+
+def flush_console() -> None:
+    """\
+    Write out whatever the console handler is holding -- `StructuredHandler`
+    block-buffers, and `QueuedHandler` has a queue -- so it lands before the
+    output of a child process, or before `os.exec*` throws it away.
+    """
+    if _console_handler is not None:
+        _console_handler.flush()
+
+
+def setup(
+    module_name: str,
+    level: TLevelValue = DEFAULT_PKG_LEVEL,
+    *,
+    queued: Optional[bool] = None,
+) -> None:
     logging.setLoggerClass(KwdsLogger)
 
-    rich_handler = RichHandler.singleton()
-    get_lib_logger().addHandler(rich_handler)
-    get_pkg_logger(module_name).addHandler(rich_handler)
+    configure_sampling()
+    set_format(module_name, CFG.clavier.log.format, queued=queued)
+    if CFG.clavier.log.segments.enabled:
+        add_segment_handler(module_name)
 
     set_lib_level(CFG.clavier.log.level)
     set_pkg_level(module_name, level)
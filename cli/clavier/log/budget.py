@@ -0,0 +1,197 @@
+"""\
+Contains `RenderBudget` and `truncate`, which cut log data values down to size
+before `RichHandler` builds renderables for them.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    List,
+    NamedTuple,
+)
+from pathlib import PurePath
+
+# Values we leave as they are, short of very long strings
+_SCALARS = (bool, int, float, complex, type(None), PurePath)
+
+
+class RenderBudget(NamedTuple):
+    """\
+    Limits for rendering the `data` of one log record:
+
+    1.  `max_depth` -- how deep to go into nested containers.
+    2.  `max_items` -- items shown per container.
+    3.  `max_string` -- characters shown per string (or `repr`).
+    4.  `max_bytes` -- (roughly) characters shown for the whole record.
+    """
+
+    max_depth: int = 4
+    max_items: int = 32
+    max_string: int = 512
+    max_bytes: int = 16 * 1024
+
+
+DEFAULT_BUDGET = RenderBudget()
+
+
+class Truncated:
+    """\
+    Stands in for what was cut. Its `repr` is the marker text, so it renders
+    bare under `rich.pretty.Pretty`.
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __repr__(self) -> str:
+        return self.text
+
+
+class _Spent:
+    """How much of a budget's `max_bytes` has been used, shared by a record."""
+
+    __slots__ = ("budget", "used")
+
+    def __init__(self, budget: RenderBudget):
+        self.budget = budget
+        self.used = 0
+
+    @property
+    def left(self) -> int:
+        return self.budget.max_bytes - self.used
+
+
+def _cut_string(string: str, spent: _Spent) -> str:
+    limit = min(spent.budget.max_string, max(spent.left, 0))
+    if len(string) <= limit:
+        spent.used += len(string)
+        return string
+    spent.used += limit
+    return f"{string[:limit]}… (+{len(string) - limit} chars)"
+
+
+def _truncate(value: Any, spent: _Spent, depth: int) -> Any:
+    # pylint: disable=too-many-return-statements
+    budget = spent.budget
+
+    if isinstance(value, str):
+        return _cut_string(value, spent)
+
+    if isinstance(value, _SCALARS):
+        spent.used += 8
+        return value
+
+    if isinstance(value, (bytes, bytearray)):
+        if len(value) <= budget.max_string:
+            spent.used += len(value)
+            return value
+        spent.used += budget.max_string
+        return Truncated(
+            f"{bytes(value[:budget.max_string])!r}… "
+            f"(+{len(value) - budget.max_string} bytes)"
+        )
+
+    if isinstance(value, (dict, list, tuple, set, frozenset)):
+        if spent.left <= 0 or depth >= budget.max_depth:
+            return Truncated(f"<{type(value).__name__} of {len(value)}…>")
+
+        if isinstance(value, dict):
+            out = {}
+            for index, (key, item) in enumerate(value.items()):
+                if index >= budget.max_items or spent.left <= 0:
+                    out[Truncated("…")] = Truncated(
+                        f"+{len(value) - index} more"
+                    )
+                    break
+                out[_truncate(key, spent, depth + 1)] = _truncate(
+                    item, spent, depth + 1
+                )
+            return out
+
+        items: List[Any] = []
+        for index, item in enumerate(value):
+            if index >= budget.max_items or spent.left <= 0:
+                items.append(Truncated(f"… +{len(value) - index} more"))
+                break
+            items.append(_truncate(item, spent, depth + 1))
+        if isinstance(value, list):
+            return items
+        make = getattr(value, "_make", None)
+        if (
+            isinstance(value, tuple)
+            and hasattr(value, "_fields")
+            and make is not None
+            and len(items) == len(value)
+            and not any(isinstance(item, Truncated) for item in items)
+        ):
+            # A `NamedTuple`, that we can put back together
+            return make(items)
+        if isinstance(value, (set, frozenset)) and not any(
+            isinstance(item, Truncated) for item in items
+        ):
+            try:
+                return type(value)(items)
+            except TypeError:
+                pass
+        return tuple(items)
+
+    # Something else: we can only tell how big it will render by its `repr`.
+    # Leave it for `rich` if that's small, otherwise show the cut `repr`.
+    try:
+        rep = repr(value)
+    except Exception:  # pylint: disable=broad-except
+        return Truncated(f"<{type(value).__name__} (repr failed)>")
+    if len(rep) <= min(budget.max_string, max(spent.left, 0)):
+        spent.used += len(rep)
+        return value
+    return Truncated(_cut_string(rep, spent))
+
+
+def truncate(value: Any, budget: RenderBudget = DEFAULT_BUDGET) -> Any:
+    """\
+    Get a copy of `value` cut down to fit `budget`, with `Truncated` markers
+    where things were left out.
+
+    Examples:
+
+        >>> budget = RenderBudget(max_depth=2, max_items=3, max_string=5)
+        >>> truncate("abcdefgh", budget)
+        'abcde… (+3 chars)'
+        >>> truncate(list(range(10)), budget)
+        [0, 1, 2, … +7 more]
+        >>> truncate({"a": {"b": {"c": 1}}}, budget)
+        {'a': {'b': <dict of 1…>}}
+        >>> truncate(dict(a=1, b=2, c=3, d=4), budget)
+        {'a': 1, 'b': 2, 'c': 3, …: +1 more}
+
+    """
+    return _truncate(value, _Spent(budget), 0)
+
+
+def truncate_data(data, budget: RenderBudget = DEFAULT_BUDGET):
+    """\
+    Cut down each value in a record's `data`, sharing `max_bytes` between
+    them. Values after the budget runs out are replaced by a marker.
+
+    Examples:
+
+        >>> budget = RenderBudget(max_string=4, max_bytes=8)
+        >>> truncate_data({"a": "xxxxxx", "b": "yyyyyy", "c": "z"}, budget)
+        {'a': 'xxxx… (+2 chars)', 'b': 'yyyy… (+2 chars)', 'c': …}
+
+    """
+    spent = _Spent(budget)
+    out = {}
+    for key, value in data.items():
+        if spent.left <= 0:
+            out[key] = Truncated("…")
+        else:
+            out[key] = _truncate(value, spent, 0)
+    return out
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
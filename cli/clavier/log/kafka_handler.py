@@ -0,0 +1,519 @@
+"""\
+Contains the `KafkaHandler` class, which ships log records to a Kafka topic.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+    Union,
+)
+from datetime import timedelta
+from pathlib import Path
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from warnings import warn
+
+from .structured_handler import json_default, record_dict
+
+DEFAULT_LINGER = timedelta(milliseconds=250)
+DEFAULT_MAX_BATCH_BYTES = 1024 * 1024
+DEFAULT_COMPRESSION = "gzip"
+DEFAULT_CAPACITY = 10_000
+DEFAULT_RETRY_INTERVAL = timedelta(seconds=30)
+DEFAULT_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+# How long a send gets before we call the broker unreachable
+SEND_TIMEOUT = 10.0
+
+
+class TSendFuture(Protocol):
+    """\
+    What `TProducer.send` returns -- `kafka`'s `FutureRecordMetadata` fits.
+    `get` raises if the record didn't make it.
+    """
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        ...
+
+
+class TProducer(Protocol):
+    """\
+    What we need from a Kafka producer -- `kafka.KafkaProducer` has it. Tests
+    (and local stand-in brokers) can provide their own.
+    """
+
+    def send(self, topic: str, value: bytes) -> TSendFuture:
+        ...
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+TProducerFactory = Callable[[Sequence[str], Optional[str], int], TProducer]
+
+
+def kafka_producer(
+    servers: Sequence[str], compression: Optional[str], max_batch_bytes: int
+) -> TProducer:
+    """\
+    The default `TProducerFactory`, making a `kafka.KafkaProducer`.
+    `kafka-python` is only imported here, so it's only needed when shipping.
+    """
+    # pylint: disable=import-outside-toplevel
+    from kafka import KafkaProducer
+
+    return KafkaProducer(
+        bootstrap_servers=list(servers),
+        compression_type=compression,
+        batch_size=max_batch_bytes,
+        max_request_size=max_batch_bytes,
+        # Don't hold up our sender thread for long when the broker is gone
+        max_block_ms=int(SEND_TIMEOUT * 1000),
+    )
+
+
+# Put on the queue to tell the sender thread to wrap up
+_STOP = object()
+
+
+class KafkaHandler(logging.Handler):
+    """\
+    A `logging.Handler` that ships records as JSON messages (see
+    `clavier.log.structured_handler.record_dict`) to a Kafka `topic`.
+
+    `emit` never blocks: records go on a bounded queue (ones that don't fit
+    are counted and dropped), and a sender thread collects them into batches
+    -- sent when `linger` has passed since the first record, or when they
+    reach `max_batch_bytes`. Kafka compresses each batch with `compression`.
+
+    When the broker can't be reached, batches are appended to the `spool`
+    file (JSON lines) instead, up to `spool_max_bytes`. The producer is
+    re-created every `retry_interval`, and the spool is shipped first once
+    it works again. Without a `spool` -- or once it's full -- those records
+    are counted and dropped too, with a warning the first time.
+
+    Producers come from `producer_factory` (`kafka_producer` by default),
+    which is the seam for running against a stand-in broker.
+
+    Examples:
+
+        >>> class Sent:
+        ...     def __init__(self, error=None):
+        ...         self.error = error
+        ...     def get(self, timeout=None):
+        ...         if self.error is not None:
+        ...             raise self.error
+        >>> class StandIn:
+        ...     messages = []
+        ...     def send(self, topic, value):
+        ...         self.messages.append((topic, json.loads(value)["msg"]))
+        ...         return Sent()
+        ...     def flush(self, timeout=None): pass
+        ...     def close(self): pass
+        >>> handler = KafkaHandler(
+        ...     "logs", ["localhost:9091"],
+        ...     producer_factory=lambda *_: StandIn(),
+        ...     spool=None,
+        ... )
+        >>> logger = logging.getLogger("doctest.kafka")
+        >>> logger.addHandler(handler)
+        >>> logger.warning("Shipped")
+        >>> handler.flush()
+        >>> StandIn.messages
+        [('logs', 'Shipped')]
+
+        When the broker is down, batches land in the spool, and are shipped
+        from there once it's back:
+
+        >>> import tempfile
+        >>> spool = Path(tempfile.mkdtemp()) / "logs.spool"
+        >>> def unreachable(*_):
+        ...     raise ConnectionError("no brokers")
+        >>> handler.close()
+        >>> handler = KafkaHandler(
+        ...     "logs", ["localhost:9091"],
+        ...     producer_factory=unreachable,
+        ...     spool=spool,
+        ...     retry_interval=timedelta(0),
+        ... )
+        >>> logger.handlers = [handler]
+        >>> logger.warning("Spooled")
+        >>> handler.flush()
+        >>> [json.loads(line)["msg"] for line in spool.read_text().splitlines()]
+        ['Spooled']
+        >>> handler.producer_factory = lambda *_: StandIn()
+        >>> logger.warning("Back")
+        >>> handler.flush()
+        >>> StandIn.messages[1:], spool.exists()
+        ([('logs', 'Spooled'), ('logs', 'Back')], False)
+
+        Sends can also fail after connecting, which is only reported through
+        the future `send` returns. Those records are spooled too:
+
+        >>> class Flaky(StandIn):
+        ...     def send(self, topic, value):
+        ...         if json.loads(value)["msg"] == "Lost":
+        ...             return Sent(ConnectionError("broker went away"))
+        ...         return super().send(topic, value)
+        >>> handler.close()
+        >>> handler = KafkaHandler(
+        ...     "logs", ["localhost:9091"],
+        ...     producer_factory=lambda *_: Flaky(),
+        ...     spool=spool,
+        ...     retry_interval=timedelta(0),
+        ... )
+        >>> logger.handlers = [handler]
+        >>> logger.warning("Lost")
+        >>> handler.flush()
+        >>> [json.loads(line)["msg"] for line in spool.read_text().splitlines()]
+        ['Lost']
+        >>> handler.producer_factory = lambda *_: StandIn()
+        >>> logger.warning("Found")
+        >>> handler.flush()
+        >>> StandIn.messages[3:], spool.exists()
+        ([('logs', 'Lost'), ('logs', 'Found')], False)
+
+        Without a spool, they're counted with the rest of the dropped
+        records, and reported once the broker is back:
+
+        >>> import warnings
+        >>> handler.close()
+        >>> handler = KafkaHandler(
+        ...     "logs", ["localhost:9091"],
+        ...     producer_factory=unreachable,
+        ...     retry_interval=timedelta(0),
+        ... )
+        >>> logger.handlers = [handler]
+        >>> with warnings.catch_warnings(record=True) as caught:
+        ...     warnings.simplefilter("always")
+        ...     logger.warning("Gone")
+        ...     handler.flush()
+        >>> print(caught[-1].message)
+        Kafka is unreachable and there's no spool, dropping log records
+        >>> handler.dropped
+        1
+        >>> handler.producer_factory = lambda *_: StandIn()
+        >>> handler.flush()
+        >>> StandIn.messages[5:]
+        [('logs', 'Dropped 1 log records')]
+        >>> handler.close()
+
+    """
+
+    topic: str
+    servers: List[str]
+    linger: timedelta
+    max_batch_bytes: int
+    compression: Optional[str]
+    spool: Optional[Path]
+    spool_max_bytes: int
+    retry_interval: timedelta
+    producer_factory: TProducerFactory
+    dropped: int
+
+    _warned_no_spool: bool
+    _queue: queue.Queue
+    _producer: Optional[TProducer]
+    _last_attempt: Optional[float]
+    _thread: Optional[threading.Thread]
+
+    def __init__(
+        self,
+        topic: str,
+        servers: Sequence[str],
+        level: int = logging.NOTSET,
+        *,
+        linger: timedelta = DEFAULT_LINGER,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        compression: Optional[str] = DEFAULT_COMPRESSION,
+        capacity: int = DEFAULT_CAPACITY,
+        spool: Union[None, Path, str] = None,
+        spool_max_bytes: int = DEFAULT_SPOOL_MAX_BYTES,
+        retry_interval: timedelta = DEFAULT_RETRY_INTERVAL,
+        producer_factory: TProducerFactory = kafka_producer,
+    ):
+        super().__init__(level=level)
+        self.topic = topic
+        self.servers = list(servers)
+        self.linger = linger
+        self.max_batch_bytes = max_batch_bytes
+        self.compression = compression
+        self.spool = None if spool is None else Path(spool)
+        self.spool_max_bytes = spool_max_bytes
+        self.retry_interval = retry_interval
+        self.producer_factory = producer_factory
+        self.dropped = 0
+        self._warned_no_spool = False
+        self._queue = queue.Queue(maxsize=capacity)
+        self._producer = None
+        self._last_attempt = None
+        self._thread = threading.Thread(
+            target=self._send_loop,
+            name=f"{__name__}.{self.__class__.__name__}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def emit(self, record):
+        data = getattr(record, "data", None)
+        if data:
+            record.data = dict(data)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._count_dropped(1)
+
+    def _count_dropped(self, count: int) -> None:
+        # `emit` and the sender thread both count
+        self.acquire()
+        try:
+            self.dropped += count
+        finally:
+            self.release()
+
+    def encode(self, record: logging.LogRecord) -> bytes:
+        return json.dumps(record_dict(record), default=json_default).encode(
+            "utf-8"
+        )
+
+    # Sender Thread
+    # ------------------------------------------------------------------------
+
+    def _send_loop(self) -> None:
+        batch: List[bytes] = []
+        size = 0
+        deadline: Optional[float] = None
+        while True:
+            timeout = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, logging.LogRecord):
+                # pylint: disable=broad-except
+                try:
+                    value = self.encode(item)
+                except Exception:
+                    self.handleError(item)
+                else:
+                    batch.append(value)
+                    size += len(value)
+                    if deadline is None:
+                        deadline = (
+                            time.monotonic() + self.linger.total_seconds()
+                        )
+
+            if (
+                item is None
+                or size >= self.max_batch_bytes
+                or not isinstance(item, logging.LogRecord)
+                or (deadline is not None and time.monotonic() >= deadline)
+            ):
+                if batch or self.dropped:
+                    self._ship(batch)
+                batch, size, deadline = [], 0, None
+
+            if item is not None:
+                if isinstance(item, threading.Event):
+                    item.set()
+                self._queue.task_done()
+                if item is _STOP:
+                    self._close_producer()
+                    return
+
+    def _connect(self) -> Optional[TProducer]:
+        if self._producer is not None:
+            return self._producer
+        now = time.monotonic()
+        if (
+            self._last_attempt is not None
+            and now - self._last_attempt < self.retry_interval.total_seconds()
+        ):
+            return None
+        self._last_attempt = now
+        # pylint: disable=broad-except
+        try:
+            self._producer = self.producer_factory(
+                self.servers, self.compression, self.max_batch_bytes
+            )
+        except Exception as error:
+            warn(f"Failed to connect to Kafka {self.servers}: {error}")
+        return self._producer
+
+    def _close_producer(self) -> None:
+        producer, self._producer = self._producer, None
+        if producer is not None:
+            # pylint: disable=broad-except
+            try:
+                producer.close()
+            except Exception:
+                pass
+
+    def _send(
+        self, producer: TProducer, values: Sequence[bytes]
+    ) -> List[bytes]:
+        """\
+        Send `values`, returning those that didn't make it. `flush` doesn't
+        tell us, so we ask each send's future.
+        """
+        futures = [(value, producer.send(self.topic, value)) for value in values]
+        producer.flush(timeout=SEND_TIMEOUT)
+        failed = []
+        error = None
+        for value, future in futures:
+            # pylint: disable=broad-except
+            try:
+                future.get(timeout=SEND_TIMEOUT)
+            except Exception as send_error:
+                failed.append(value)
+                error = send_error
+        if failed:
+            warn(f"Failed to send {len(failed)} log records to Kafka: {error}")
+        return failed
+
+    def _take_dropped(self) -> int:
+        self.acquire()
+        try:
+            dropped, self.dropped = self.dropped, 0
+        finally:
+            self.release()
+        return dropped
+
+    def _dropped_value(self, dropped: int) -> bytes:
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %d log records",
+            args=(dropped,),
+            exc_info=None,
+        )
+        record.data = dict(dropped=dropped)
+        return self.encode(record)
+
+    def _ship(self, batch: List[bytes]) -> None:
+        dropped = self._take_dropped()
+        report = self._dropped_value(dropped) if dropped else None
+        if report is not None:
+            batch = [*batch, report]
+
+        producer = self._connect()
+        if producer is not None:
+            # pylint: disable=broad-except
+            try:
+                self._ship_spool(producer)
+                failed = self._send(producer, batch)
+            except Exception as error:
+                warn(f"Failed to ship logs to Kafka, spooling: {error}")
+                self._close_producer()
+            else:
+                if not failed:
+                    return
+                # Likely lost the broker -- reconnect next time around
+                self._close_producer()
+                batch = failed
+        lost = self._spool(batch)
+        if lost:
+            # The report stands for the records it counted
+            reported = any(value is report for value in lost)
+            self._count_dropped(len(lost) + (dropped - 1 if reported else 0))
+
+    # Spool
+    # ------------------------------------------------------------------------
+
+    def _spool(self, batch: Sequence[bytes]) -> List[bytes]:
+        """\
+        Append `batch` to the spool, returning the values that couldn't be
+        kept -- all of them when there's no spool, or it's full.
+        """
+        if not batch:
+            return []
+        if self.spool is None:
+            if not self._warned_no_spool:
+                self._warned_no_spool = True
+                warn(
+                    "Kafka is unreachable and there's no spool, dropping log "
+                    "records"
+                )
+            return list(batch)
+        try:
+            size = self.spool.stat().st_size
+        except OSError:
+            size = 0
+        if size >= self.spool_max_bytes:
+            return list(batch)
+        try:
+            self.spool.parent.mkdir(parents=True, exist_ok=True)
+            with self.spool.open("ab") as file:
+                for value in batch:
+                    file.write(value + b"\n")
+        except OSError as error:
+            warn(f"Failed to spool logs to {self.spool}: {error}")
+            return list(batch)
+        return []
+
+    def _ship_spool(self, producer: TProducer) -> None:
+        if self.spool is None or not self.spool.exists():
+            return
+        # Move it aside first, so a failure part-way re-spools the rest
+        # instead of shipping the front twice
+        shipping = self.spool.with_name(self.spool.name + ".shipping")
+        os.replace(self.spool, shipping)
+        with shipping.open("rb") as file:
+            values = [line.rstrip(b"\n") for line in file if line.strip()]
+        # pylint: disable=broad-except
+        try:
+            failed = self._send(producer, values)
+        except Exception:
+            self._count_dropped(len(self._spool(values)))
+            raise
+        finally:
+            shipping.unlink()
+        if failed:
+            self._count_dropped(len(self._spool(failed)))
+            raise ConnectionError(
+                f"{len(failed)} spooled log records failed to send"
+            )
+
+    # Handler API
+    # ------------------------------------------------------------------------
+
+    def flush(self):
+        """\
+        Ship whatever is waiting now, and wait (a bit) for it to go out or
+        be spooled.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout=SEND_TIMEOUT * 2)
+
+    def close(self):
+        if self._thread is not None:
+            if self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join(timeout=SEND_TIMEOUT * 2)
+            self._thread = None
+        super().close()
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,99 @@
+"""\
+Contains the `Lazy` class, for log data that is only computed if it is going
+to be written.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Mapping,
+)
+import logging
+
+
+class Lazy:
+    """\
+    A value in `KwdsLogger` keyword data that is computed by calling `fn`
+    with `args` and `kwds` -- but only when a handler actually emits the
+    record. Records below the logger's level, or dropped along the way,
+    never pay for it.
+
+    Only `Lazy` instances are deferred. Plain callables are logged as-is,
+    since we log functions themselves (command targets, etc.) as data.
+
+    Examples:
+
+        >>> calls = []
+        >>> lazy = Lazy(lambda x: calls.append(x) or x * 2, 21)
+        >>> calls
+        []
+        >>> resolve(lazy), calls
+        (42, [21])
+
+    """
+
+    __slots__ = ("fn", "args", "kwds")
+
+    fn: Callable[..., Any]
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwds):
+        self.fn = fn
+        self.args = args
+        self.kwds = kwds
+
+    def resolve(self) -> Any:
+        return self.fn(*self.args, **self.kwds)
+
+    def __repr__(self) -> str:
+        name = getattr(self.fn, "__qualname__", None) or repr(self.fn)
+        return f"<Lazy {name}>"
+
+
+def resolve(value: Any) -> Any:
+    """\
+    Resolve `value` if it is `Lazy`, otherwise return it unchanged. Errors
+    raised while resolving become the (string) value, because failing to
+    log a detail shouldn't take the log record down with it.
+    """
+    if not isinstance(value, Lazy):
+        return value
+    # pylint: disable=broad-except
+    try:
+        return value.resolve()
+    except Exception as error:
+        return f"<{type(error).__name__} resolving {value!r}: {error}>"
+
+
+def resolve_data(record: logging.LogRecord) -> Mapping[str, Any]:
+    """\
+    Get the `data` of a record with any `Lazy` values resolved. The resolved
+    mapping replaces `record.data`, so multiple handlers only resolve once.
+
+    Examples:
+
+        >>> record = logging.makeLogRecord(
+        ...     dict(data=dict(a=1, b=Lazy(str.upper, "b")))
+        ... )
+        >>> resolve_data(record)
+        {'a': 1, 'b': 'B'}
+        >>> record.data
+        {'a': 1, 'b': 'B'}
+
+    """
+    data = getattr(record, "data", None)
+    if not data:
+        return {}
+    if any(isinstance(value, Lazy) for value in data.values()):
+        resolved: Dict[str, Any] = {
+            key: resolve(value) for key, value in data.items()
+        }
+        record.data = resolved
+        return resolved
+    return data
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
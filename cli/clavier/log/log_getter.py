@@ -1,8 +1,8 @@
 """Defines `LogGetter` class."""
 
-from functools import wraps
+from functools import partial, wraps
 import logging
-from typing import Any
+from typing import Any, Dict, Optional, Type
 
 from clavier.etc.ins import is_unbound_method_of
 
@@ -19,51 +19,135 @@ class LogGetter:
     end up being regular `logging.Logger` classes that would not support the
     "keyword" log method signature we prefer to use.
 
+    The resolved logger is cached, together with the logger class that was
+    installed when it was resolved. Calls skip `logging.getLogger` (and the
+    module lock it takes) until the logger class changes, as it does when
+    `setup()` installs `KwdsLogger`. Child getters are memoized too.
+
     See `KwdsLogger` and `getLogger`.
+
+    Examples:
+
+        >>> log = LogGetter("doctest")
+        >>> log._logger is log._logger is logging.getLogger("doctest")
+        True
+        >>> log.getChild("child") is log.getChild("child")
+        True
+
     """
 
     name: str
+    _cached: Optional[logging.Logger]
+    _cached_class: Optional[Type[logging.Logger]]
+    _children: Dict[str, "LogGetter"]
 
     def __init__(self, *name: str):
         self.name = ".".join(name)
+        self._cached = None
+        self._cached_class = None
+        self._children = {}
 
     @property
     def _logger(self) -> logging.Logger:
-        return logging.getLogger(self.name)
+        logger_class = logging.getLoggerClass()
+        if self._cached is None or self._cached_class is not logger_class:
+            self._cached = logging.getLogger(self.name)
+            self._cached_class = logger_class
+        return self._cached
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self._logger, name)
 
     def getChild(self, name):
-        return LogGetter(f"{self.name}.{name}")
+        child = self._children.get(name)
+        if child is None:
+            child = self._children[name] = LogGetter(f"{self.name}.{name}")
+        return child
 
     def inject(self, fn):
+        """\
+        Decorate `fn` to receive a child logger (named after the function) as
+        its first regular argument, unless the caller passes a logger there
+        themselves.
+
+        The child logger is resolved here, once. Whether `fn` is a method --
+        where the logger goes _after_ `self` -- is worked out on the first
+        call with arguments and remembered, so later calls don't pay for the
+        reflection.
+
+        The wrapper also exposes:
+
+        1.  `log` -- the child logger.
+        2.  `direct` -- `fn` with `log` already bound as the first argument,
+            for plain functions called in tight loops. It skips the wrapper
+            entirely, including the check for a logger override.
+
+        Examples:
+
+            >>> log = LogGetter("doctest")
+            >>> @log.inject
+            ... def f(log, x):
+            ...     return log.name, x
+            >>> f(1)
+            ('doctest.f', 1)
+            >>> f.direct(2)
+            ('doctest.f', 2)
+            >>> f(LogGetter("other"), 3)
+            ('other', 3)
+
+            >>> class C:
+            ...     @log.inject
+            ...     def m(self, log, x):
+            ...         return log.name, x
+            >>> C().m(4)
+            ('doctest.m', 4)
+
+        """
+        child = self.getChild(fn.__name__)
+        logger_types = (self.__class__, logging.Logger)
+        # `None` until we've seen a call with arguments, then whether to insert
+        # after the first one (a method) or not (a function)
+        insert_at: Optional[int] = None
+
         @wraps(fn)
         def log_inject_wrapper(*args, **kwds):
+            nonlocal insert_at
+
             if len(args) == 0:
-                return fn(self.getChild(fn.__name__), **kwds)
+                return fn(child, **kwds)
 
-            # See if this is a method call, where we need to deal with the
-            # _second_ argument
-            insert_at = 1 if is_unbound_method_of(fn, args[0]) else 0
+            if insert_at is None:
+                # See if this is a method call, where we need to deal with the
+                # _second_ argument
+                insert_at = 1 if is_unbound_method_of(fn, args[0]) else 0
 
-            pre_args = args[0:insert_at]
-            post_args = args[insert_at:]
+            if insert_at == 0:
+                if isinstance(args[0], logger_types):
+                    # The first regular arg is a `LogGetter` or
+                    # `logging.Logger`, so no injection this time
+                    return fn(*args, **kwds)
+                return fn(child, *args, **kwds)
 
-            if len(post_args) == 0:
+            if len(args) == 1:
                 # There are no regular args, so there can't be an overriding
                 # logger given as the first regular arg.
                 #
                 # Inject as the (only) regular arg
-                return fn(*pre_args, self.getChild(fn.__name__), **kwds)
+                return fn(args[0], child, **kwds)
 
-            if isinstance(post_args[0], (self.__class__, logging.Logger)):
-                # The first regular arg is a `LogGetter` or `logging.Logger`,
-                # so no injection this time
+            if isinstance(args[1], logger_types):
                 return fn(*args, **kwds)
 
             # And finally, the first regular arg is not an logger override,
             # so inject in there and be done with it
-            return fn(*pre_args, self.getChild(fn.__name__), *post_args, **kwds)
+            return fn(args[0], child, *args[1:], **kwds)
+
+        log_inject_wrapper.log = child
+        log_inject_wrapper.direct = partial(fn, child)
 
         return log_inject_wrapper
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,187 @@
+"""\
+Contains the `QueuedHandler` class.
+"""
+
+from __future__ import annotations
+from typing import (
+    List,
+    Literal,
+    Optional,
+)
+import copy
+import logging
+import queue
+import threading
+
+# What to do when the queue is full:
+#
+# 1.  `block` -- wait for room, slowing the logging thread down to the speed
+#     of the handler. Nothing is lost.
+# 2.  `drop` -- discard the record and carry on. A count of dropped records is
+#     logged when the handler catches up.
+#
+TPolicy = Literal["block", "drop"]
+
+DEFAULT_CAPACITY = 10_000
+DEFAULT_POLICY: TPolicy = "block"
+DEFAULT_BATCH_SIZE = 256
+
+# Put on the queue to tell the listener thread to wrap up
+_STOP = object()
+
+
+class QueuedHandler(logging.Handler):
+    """\
+    A `logging.Handler` that puts records on a bounded queue and returns,
+    leaving a listener thread to pass them -- in batches -- to the `handler`
+    that actually renders them.
+
+    Keeps slow rendering and terminal I/O off of hot threads, like MIDI input
+    callbacks or Kafka poll loops.
+
+    Like stdlib's `logging.handlers.QueueHandler`, the message is formatted
+    (`msg % args`) when the record is queued, and the `data` mapping from
+    `KwdsLogger` is (shallow) copied, so later changes at the call site don't
+    leak into the log.
+
+    Examples:
+
+        >>> from io import StringIO
+        >>> from clavier.log.kwds_logger import KwdsLogger
+        >>> from clavier.log.structured_handler import StructuredHandler
+        >>> stream = StringIO()
+        >>> handler = QueuedHandler(StructuredHandler("json", stream=stream))
+        >>> logger = KwdsLogger("doctest")
+        >>> logger.addHandler(handler)
+        >>> items = [1]
+        >>> logger.warning("Queued %s", items, n=1)
+        >>> items.append(2)
+        >>> handler.flush()
+        >>> '"msg": "Queued [1]"' in stream.getvalue()
+        True
+        >>> handler.close()
+
+    """
+
+    handler: logging.Handler
+    policy: TPolicy
+    batch_size: int
+    dropped: int
+    _queue: queue.Queue
+    _thread: Optional[threading.Thread]
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        level: int = logging.NOTSET,
+        *,
+        capacity: int = DEFAULT_CAPACITY,
+        policy: TPolicy = DEFAULT_POLICY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        super().__init__(level=level)
+        if policy not in ("block", "drop"):
+            raise ValueError(
+                f"Expected `policy` to be 'block' or 'drop', given {policy!r}"
+            )
+        self.handler = handler
+        self.policy = policy
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=capacity)
+        self._thread = threading.Thread(
+            target=self._listen,
+            name=f"{__name__}.{self.__class__.__name__}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A copy, as other handlers get the same record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        data = getattr(record, "data", None)
+        if data:
+            record.data = dict(data)
+        return record
+
+    def emit(self, record):
+        # pylint: disable=broad-except
+        try:
+            record = self.prepare(record)
+            if self.policy == "block":
+                self._queue.put(record)
+            else:
+                try:
+                    self._queue.put_nowait(record)
+                except queue.Full:
+                    self.acquire()
+                    try:
+                        self.dropped += 1
+                    finally:
+                        self.release()
+        except (KeyboardInterrupt, SystemExit) as error:
+            raise error
+        except Exception:
+            self.handleError(record)
+
+    def _report_dropped(self) -> None:
+        self.acquire()
+        try:
+            dropped, self.dropped = self.dropped, 0
+        finally:
+            self.release()
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %d log records (queue full)",
+            args=(dropped,),
+            exc_info=None,
+        )
+        record.data = dict(dropped=dropped, capacity=self._queue.maxsize)
+        self.handler.handle(record)
+
+    def _listen(self) -> None:
+        while True:
+            batch: List = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is _STOP:
+                    stop = True
+                else:
+                    self.handler.handle(record)
+            if self.dropped:
+                self._report_dropped()
+            self.handler.flush()
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Wait for everything queued so far to be handled."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        self.handler.flush()
+
+    def close(self):
+        """Drain the queue, stop the listener thread and close."""
+        if self._thread is not None:
+            if self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join()
+            self._thread = None
+        super().close()
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -20,6 +20,8 @@ from rich.pretty import Pretty
 from rich.highlighter import ReprHighlighter
 
 from .. import io
+from .lazy import resolve_data
+from .budget import DEFAULT_BUDGET, RenderBudget, truncate_data
 
 class RichHandler(logging.Handler):
     """\
@@ -27,6 +29,10 @@ class RichHandler(logging.Handler):
     entries to the console.
 
     Output is meant for specifically humans.
+
+    Record `data` is cut down to fit `budget` (see
+    `clavier.log.budget.RenderBudget`) before any renderables are built, so
+    one huge value can't stall logging.
     """
 
     # Default consoles, pointing to the two standard output streams
@@ -55,6 +61,7 @@ class RichHandler(logging.Handler):
 
     consoles: Mapping[str, Console]
     level_map: Mapping[int, str]
+    budget: RenderBudget
 
     def __init__(
         self,
@@ -62,6 +69,7 @@ class RichHandler(logging.Handler):
         *,
         consoles: Optional[Mapping[str, Console]] = None,
         level_map: Optional[Mapping[int, str]] = None,
+        budget: RenderBudget = DEFAULT_BUDGET,
     ):
         super().__init__(level=level)
 
@@ -75,6 +83,8 @@ class RichHandler(logging.Handler):
         else:
             self.level_map = {**self.DEFAULT_LEVEL_MAP, **level_map}
 
+        self.budget = budget
+
     def emit(self, record):
         # pylint: disable=broad-except
         try:
@@ -118,13 +128,15 @@ class RichHandler(logging.Handler):
 
         output.add_row(None, msg)
 
-        if hasattr(record, "data") and record.data:
+        data = resolve_data(record)
+        if data:
             table = Table.grid(padding=(0, 1))
             table.expand = True
             table.add_column(style=Style(color="blue", italic=True))
             table.add_column(style=Style(color="#4ec9b0", italic=True))
             table.add_column()
-            for key, value in record.data.items():
+            shown_values = truncate_data(data, self.budget).values()
+            for (key, value), shown in zip(data.items(), shown_values):
                 if io.is_rich(value):
                     rich_value_type = None
                     rich_value = value
@@ -141,8 +153,8 @@ class RichHandler(logging.Handler):
                             rich_value_type = value_type.__name__
                     else:
                         rich_value_type = Pretty(value_type)
-                    if isinstance(value, str):
-                        rich_value = value
+                    if isinstance(shown, str):
+                        rich_value = shown
                     elif (
                         inspect.isfunction(value) and
                         hasattr(value, "__module__") and
@@ -152,7 +164,7 @@ class RichHandler(logging.Handler):
                             f"<function {value.__module__}.{value.__name__}>"
                         )
                     else:
-                        rich_value = Pretty(value)
+                        rich_value = Pretty(shown)
                 table.add_row(key, rich_value_type, rich_value)
             output.add_row(None, table)
 
@@ -0,0 +1,274 @@
+"""\
+Contains the `SamplingFilter` class, which rate-limits and samples log records
+per call site.
+"""
+
+from __future__ import annotations
+from typing import (
+    Dict,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+import logging
+import re
+import threading
+import time
+
+# Records at this level and above are never sampled
+UNSAMPLED_LEVEL = logging.WARNING
+
+DEFAULT_SUMMARY_INTERVAL = 10.0
+
+RATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*/\s*s(?:ec)?")
+ONE_IN_RE = re.compile(r"1\s*/\s*(\d+)")
+FIRST_RE = re.compile(r"first\s+(\d+)")
+
+
+class Policy(NamedTuple):
+    """\
+    How to sample records from a call site. Written as a string, one of:
+
+    1.  `"N/s"` -- at most `N` records per second.
+    2.  `"1/K"` -- one in every `K` records (the first, the `K+1`th, ...).
+    3.  `"first N"` -- the first `N` records, then nothing.
+
+    `"none"` (or empty) means no sampling.
+
+    Examples:
+
+        >>> Policy.parse("20/s"), Policy.parse("1/100"), Policy.parse("first 5")
+        (Policy(kind='rate', n=20.0), Policy(kind='one_in', n=100), Policy(kind='first', n=5))
+        >>> Policy.parse("none") is None
+        True
+
+        >>> Policy.parse("lots")
+        Traceback (most recent call last):
+            ...
+        ValueError: Expected log sampling like 'N/s', '1/K' or 'first N', given 'lots'
+
+    """
+
+    kind: str
+    n: float
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> Optional[Policy]:
+        if spec is None:
+            return None
+        compact = spec.strip().lower()
+        if compact in ("", "none"):
+            return None
+        if match := RATE_RE.fullmatch(compact):
+            return cls("rate", float(match[1]))
+        if match := ONE_IN_RE.fullmatch(compact):
+            return cls("one_in", int(match[1]))
+        if match := FIRST_RE.fullmatch(compact):
+            return cls("first", int(match[1]))
+        raise ValueError(
+            "Expected log sampling like 'N/s', '1/K' or 'first N', given "
+            f"{spec!r}"
+        )
+
+
+class _Site:
+    """Sampling state for one call site."""
+
+    __slots__ = (
+        "name", "label", "policy", "seen", "suppressed", "tokens", "stamp"
+    )
+
+    def __init__(self, name: str, lineno: int, policy: Policy, now: float):
+        self.name = name
+        self.label = f"{name}:{lineno}"
+        self.policy = policy
+        self.seen = 0
+        self.suppressed = 0
+        self.tokens = policy.n
+        self.stamp = now
+
+    def admit(self, now: float) -> bool:
+        self.seen += 1
+        kind, n = self.policy
+        if kind == "rate":
+            # Token bucket holding up to one second's worth of records
+            self.tokens = min(n, self.tokens + (now - self.stamp) * n)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+        elif kind == "one_in":
+            if (self.seen - 1) % n == 0:
+                return True
+        elif self.seen <= n:
+            return True
+        self.suppressed += 1
+        return False
+
+
+class SamplingFilter(logging.Filter):
+    """\
+    A `logging.Filter` that samples records below `UNSAMPLED_LEVEL` per call
+    site (source file and line), following the `Policy` for the record's
+    logger. Policies come from `loggers`, a mapping of logger names to policy
+    strings, where the closest dotted parent wins. `default` covers loggers
+    without one.
+
+    Every `summary_interval` seconds, the counts of suppressed records are
+    logged as one summary record. `summarize()` does the same on demand; the
+    `clavier.log.flush()` call on exit uses it to report any remaining counts.
+
+    It goes on handlers, not loggers, because logger filters don't see
+    records propagated up from child loggers. A record that reaches several
+    handlers with the filter is only counted once.
+
+    Examples:
+
+        >>> from io import StringIO
+        >>> from clavier.log.structured_handler import StructuredHandler
+        >>> stream = StringIO()
+        >>> handler = StructuredHandler(stream=stream)
+        >>> handler.addFilter(SamplingFilter(loggers={"doctest": "first 2"}))
+        >>> logger = logging.getLogger("doctest.sampling")
+        >>> logger.setLevel(logging.INFO)
+        >>> logger.addHandler(handler)
+        >>> for n in range(5):
+        ...     logger.info("Tick %d", n)
+        >>> handler.filters[0].summarize()
+        >>> for line in stream.getvalue().splitlines():
+        ...     print(line.split(" ", 3)[3]) # doctest: +ELLIPSIS
+        msg="Tick 0"
+        msg="Tick 1"
+        msg="Suppressed 3 log records" suppressed="{\\"doctest.sampling:...\\": 3}"
+
+    """
+
+    default: Optional[Policy]
+    loggers: Dict[str, Optional[Policy]]
+    summary_interval: float
+
+    _policies: Dict[str, Optional[Policy]]
+    _sites: Dict[Tuple[str, int], _Site]
+    _last_summary: float
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        default: Optional[str] = None,
+        loggers: Optional[Mapping[str, Optional[str]]] = None,
+        summary_interval: float = DEFAULT_SUMMARY_INTERVAL,
+    ):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._last_summary = time.monotonic()
+        self.configure(default, loggers, summary_interval)
+
+    def configure(
+        self,
+        default: Optional[str] = None,
+        loggers: Optional[Mapping[str, Optional[str]]] = None,
+        summary_interval: float = DEFAULT_SUMMARY_INTERVAL,
+    ) -> None:
+        """\
+        (Re-)set the policies, starting every call site over.
+        """
+        default_policy = Policy.parse(default)
+        logger_policies = {
+            name: Policy.parse(spec) for name, spec in (loggers or {}).items()
+        }
+        with self._lock:
+            self.default = default_policy
+            self.loggers = logger_policies
+            self.summary_interval = summary_interval
+            self._policies = {}
+            self._sites = {}
+
+    @property
+    def is_active(self) -> bool:
+        return self.default is not None or any(
+            policy is not None for policy in self.loggers.values()
+        )
+
+    def policy_for(self, name: str) -> Optional[Policy]:
+        if name in self._policies:
+            return self._policies[name]
+        prefix = name
+        while True:
+            if prefix in self.loggers:
+                policy = self.loggers[prefix]
+                break
+            if "." not in prefix:
+                policy = self.default
+                break
+            prefix = prefix.rsplit(".", 1)[0]
+        self._policies[name] = policy
+        return policy
+
+    def filter(self, record):
+        if record.levelno >= UNSAMPLED_LEVEL:
+            return True
+        decision = getattr(record, "_sampled", None)
+        if decision is not None:
+            return decision
+        policy = self.policy_for(record.name)
+        if policy is None:
+            return True
+
+        now = time.monotonic()
+        site_key = (record.pathname, record.lineno)
+        with self._lock:
+            site = self._sites.get(site_key)
+            if site is None or site.policy is not policy:
+                site = self._sites[site_key] = _Site(
+                    record.name, record.lineno, policy, now
+                )
+            decision = site.admit(now)
+            due = now - self._last_summary >= self.summary_interval
+        record._sampled = decision
+
+        if due:
+            self.summarize()
+        return decision
+
+    def summarize(self) -> None:
+        """\
+        Log the counts of records suppressed since the last summary, if any,
+        as one record.
+
+        It is handled by the logger of a suppressed call site, so it reaches
+        the same handlers those records would have.
+        """
+        with self._lock:
+            self._last_summary = time.monotonic()
+            suppressed = {}
+            via = None
+            for site in self._sites.values():
+                if site.suppressed:
+                    suppressed[site.label] = site.suppressed
+                    site.suppressed = 0
+                    via = via or site.name
+        if via is None:
+            return
+
+        total = sum(suppressed.values())
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.INFO,
+            pathname=__file__,
+            lineno=0,
+            msg="Suppressed %d log records",
+            args=(total,),
+            exc_info=None,
+        )
+        record.data = dict(suppressed=suppressed)
+        # Marked as decided, so it passes this filter wherever it goes.
+        # `Logger.handle` skips the level check, so it isn't lost to a quiet
+        # logger either.
+        record._sampled = True
+        logging.getLogger(via).handle(record)
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,510 @@
+"""\
+Contains the `SegmentHandler` class, a log sink that keeps structured records
+in rotating, compressed segment files, and `query` to read them back.
+
+Each record is a length-prefixed, compact JSON array of
+`[ts, levelno, name, msg, data]` (plus the formatted exception, if any).
+
+The segment being written is a plain `.seg` file. When it rotates -- on size,
+on age, or when the handler closes -- it is gzipped to `.seg.gz` and an
+`.idx` file is written next to it, with the time range, levels and logger
+names it holds. `query` reads the indexes first and only opens segments that
+can match.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+from datetime import timedelta
+from pathlib import Path
+import gzip
+from io import BufferedIOBase
+import json
+import logging
+import os
+import shutil
+import struct
+import time
+from warnings import warn
+
+from .lazy import resolve_data
+from .structured_handler import json_default, message_for
+
+FORMAT = 1
+
+# Big-endian `uint32` byte length that precedes each record
+HEADER = struct.Struct(">I")
+
+SEGMENT_SUFFIX = ".seg"
+COMPRESSED_SUFFIX = ".seg.gz"
+INDEX_SUFFIX = ".idx"
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_AGE = timedelta(hours=1)
+DEFAULT_RETENTION = timedelta(days=7)
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+def encode(record: logging.LogRecord) -> bytes:
+    row: List[Any] = [
+        record.created,
+        record.levelno,
+        record.name,
+        message_for(record),
+        resolve_data(record),
+    ]
+    if record.exc_info:
+        row.append(_EXC_FORMATTER.formatException(record.exc_info))
+    body = json.dumps(
+        row, separators=(",", ":"), default=json_default
+    ).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+def decode(body: bytes) -> Dict[str, Any]:
+    """\
+    Examples:
+
+        >>> record = logging.makeLogRecord(
+        ...     dict(created=1.5, levelno=20, name="a.b", msg="Hi", data={"x": 1})
+        ... )
+        >>> frame = encode(record)
+        >>> HEADER.unpack(frame[:HEADER.size])[0] == len(frame) - HEADER.size
+        True
+        >>> decode(frame[HEADER.size:])
+        {'ts': 1.5, 'levelno': 20, 'level': 'INFO', 'name': 'a.b', 'msg': 'Hi', 'data': {'x': 1}}
+
+    """
+    ts, levelno, name, msg, data, *rest = json.loads(body)
+    row = dict(
+        ts=ts,
+        levelno=levelno,
+        level=logging.getLevelName(levelno),
+        name=name,
+        msg=msg,
+        data=data,
+    )
+    if rest:
+        row["exc"] = rest[0]
+    return row
+
+
+def iter_rows(file: BufferedIOBase) -> Iterator[Dict[str, Any]]:
+    """\
+    Decode the records in a segment file. Stops quietly at a truncated
+    record, which is what a crash mid-write leaves behind.
+    """
+    while True:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        (length,) = HEADER.unpack(header)
+        body = file.read(length)
+        if len(body) < length:
+            return
+        yield decode(body)
+
+
+def open_segment(path: Path) -> BufferedIOBase:
+    if path.name.endswith(COMPRESSED_SUFFIX):
+        return gzip.open(path, "rb")
+    return path.open("rb")
+
+
+def is_logger_or_child(name: str, logger: str) -> bool:
+    return name == logger or name.startswith(logger + ".")
+
+
+class SegmentIndex:
+    """\
+    What a segment holds: time range, record counts by level and logger
+    names. Enough to tell whether a query needs to open it.
+    """
+
+    first_ts: Optional[float]
+    last_ts: Optional[float]
+    count: int
+    levels: Dict[int, int]
+    loggers: set
+
+    @classmethod
+    def load(cls, path: Path) -> SegmentIndex:
+        with path.open("r", encoding="utf-8") as file:
+            dct = json.load(file)
+        if dct.get("format") != FORMAT:
+            raise ValueError(f"Unknown segment index format in {path}")
+        index = cls()
+        index.first_ts = dct["first_ts"]
+        index.last_ts = dct["last_ts"]
+        index.count = dct["count"]
+        index.levels = {int(k): v for k, v in dct["levels"].items()}
+        index.loggers = set(dct["loggers"])
+        return index
+
+    @classmethod
+    def scan(cls, path: Path) -> SegmentIndex:
+        index = cls()
+        with open_segment(path) as file:
+            for row in iter_rows(file):
+                index.add(row["ts"], row["levelno"], row["name"])
+        return index
+
+    def __init__(self):
+        self.first_ts = None
+        self.last_ts = None
+        self.count = 0
+        self.levels = {}
+        self.loggers = set()
+
+    @property
+    def max_level(self) -> int:
+        return max(self.levels, default=logging.NOTSET)
+
+    def add(self, ts: float, levelno: int, name: str) -> None:
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts = ts
+        self.count += 1
+        self.levels[levelno] = self.levels.get(levelno, 0) + 1
+        self.loggers.add(name)
+
+    def matches(
+        self,
+        *,
+        since: Optional[float] = None,
+        level: int = logging.NOTSET,
+        logger: Optional[str] = None,
+    ) -> bool:
+        if self.count == 0:
+            return False
+        if since is not None and (
+            self.last_ts is None or self.last_ts < since
+        ):
+            return False
+        if self.max_level < level:
+            return False
+        if logger is not None and not any(
+            is_logger_or_child(name, logger) for name in self.loggers
+        ):
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(
+            format=FORMAT,
+            first_ts=self.first_ts,
+            last_ts=self.last_ts,
+            count=self.count,
+            levels=self.levels,
+            loggers=sorted(self.loggers),
+        )
+
+    def dump(self, path: Path) -> None:
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file)
+        os.replace(tmp_path, path)
+
+
+def segment_stem(segment: Path) -> str:
+    """\
+    Examples:
+
+        >>> segment_stem(Path("20210101T000000.123-0001-42.seg.gz"))
+        '20210101T000000.123-0001-42'
+
+    """
+    name = segment.name
+    for suffix in (COMPRESSED_SUFFIX, SEGMENT_SUFFIX):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def index_path_for(segment: Path) -> Path:
+    return segment.with_name(segment_stem(segment) + INDEX_SUFFIX)
+
+
+def pid_for(segment: Path) -> Optional[int]:
+    """\
+    The id of the process that wrote a segment, from its name.
+
+    Examples:
+
+        >>> pid_for(Path("20210101T000000.123-0001-42.seg"))
+        42
+
+    """
+    try:
+        return int(segment_stem(segment).rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def is_pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def list_segments(directory: Path) -> List[Path]:
+    """\
+    Segment files in `directory`, oldest first (names start with a
+    timestamp).
+    """
+    if not directory.is_dir():
+        return []
+    return sorted(
+        path
+        for path in directory.iterdir()
+        if path.name.endswith((SEGMENT_SUFFIX, COMPRESSED_SUFFIX))
+    )
+
+
+def finish_segment(path: Path, index: Optional[SegmentIndex] = None) -> Path:
+    """\
+    Compress a plain segment and write its index. Returns the compressed
+    path.
+    """
+    if index is None:
+        index = SegmentIndex.scan(path)
+    gz_path = path.with_name(path.name + ".gz")
+    tmp_path = path.with_name(gz_path.name + ".tmp")
+    with path.open("rb") as src, gzip.open(tmp_path, "wb") as dest:
+        shutil.copyfileobj(src, dest)
+    os.replace(tmp_path, gz_path)
+    index.dump(index_path_for(gz_path))
+    path.unlink()
+    return gz_path
+
+
+def query(
+    directory: Union[Path, str],
+    *,
+    since: Optional[float] = None,
+    level: int = logging.NOTSET,
+    logger: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """\
+    Read records from the segments in `directory`, oldest first, at or
+    after the `since` timestamp, at or above `level` and from `logger` (or
+    its children).
+
+    Finished segments whose index rules them out are not opened.
+    """
+    for path in list_segments(Path(directory)):
+        if path.name.endswith(COMPRESSED_SUFFIX):
+            try:
+                index = SegmentIndex.load(index_path_for(path))
+            except (OSError, ValueError, KeyError):
+                index = None
+            if index is not None and not index.matches(
+                since=since, level=level, logger=logger
+            ):
+                continue
+        try:
+            with open_segment(path) as file:
+                for row in iter_rows(file):
+                    if since is not None and row["ts"] < since:
+                        continue
+                    if row["levelno"] < level:
+                        continue
+                    if logger is not None and not is_logger_or_child(
+                        row["name"], logger
+                    ):
+                        continue
+                    yield row
+        except (OSError, EOFError) as error:
+            # Rotated away under us, or cut short by a crash
+            warn(f"Failed to read log segment {path}: {error}")
+
+
+class SegmentHandler(logging.Handler):
+    """\
+    A `logging.Handler` that writes records to rotating, compressed segment
+    files in `directory` (see the module doc). Records are buffered and the
+    file is flushed for records at `flush_level` and above, and when the
+    handler is flushed.
+
+    Segments rotate when they reach `max_bytes` or `max_age`. Finished
+    segments older than `retention` are deleted. Plain segments left behind
+    by processes that have exited are finished when a handler starts.
+
+    Examples:
+
+        >>> import tempfile
+        >>> directory = Path(tempfile.mkdtemp())
+        >>> handler = SegmentHandler(directory, max_bytes=200)
+        >>> logger = logging.getLogger("doctest.segments")
+        >>> logger.setLevel(logging.DEBUG)
+        >>> logger.addHandler(handler)
+        >>> for n in range(10):
+        ...     logger.debug("Tick %d", n)
+        >>> logger.warning("Heads up")
+        >>> handler.close()
+        >>> len(list_segments(directory)) > 1
+        True
+        >>> [row["msg"] for row in query(directory, level=logging.WARNING)]
+        ['Heads up']
+        >>> [row["msg"] for row in query(directory, logger="doctest")][:2]
+        ['Tick 0', 'Tick 1']
+        >>> shutil.rmtree(directory)
+
+    """
+
+    directory: Path
+    max_bytes: int
+    max_age: timedelta
+    retention: timedelta
+    flush_level: int
+
+    _file: Optional[BinaryIO]
+    _path: Optional[Path]
+    _index: Optional[SegmentIndex]
+    _size: int
+    _opened_at: float
+    _seq: int
+
+    def __init__(
+        self,
+        directory: Union[Path, str],
+        level: int = logging.NOTSET,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_age: timedelta = DEFAULT_MAX_AGE,
+        retention: timedelta = DEFAULT_RETENTION,
+        flush_level: int = logging.WARNING,
+    ):
+        super().__init__(level=level)
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retention = retention
+        self.flush_level = flush_level
+        self._file = None
+        self._path = None
+        self._index = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._seq = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.finish_orphans()
+        self.prune()
+
+    def finish_orphans(self) -> None:
+        """Finish plain segments whose writing process has exited."""
+        # pylint: disable=broad-except
+        for path in list_segments(self.directory):
+            if not path.name.endswith(SEGMENT_SUFFIX):
+                continue
+            pid = pid_for(path)
+            if pid is not None and (pid == os.getpid() or is_pid_alive(pid)):
+                continue
+            try:
+                finish_segment(path)
+            except Exception as error:
+                warn(f"Failed to finish log segment {path}: {error}")
+
+    def prune(self) -> None:
+        """Delete finished segments older than `retention`."""
+        cutoff = time.time() - self.retention.total_seconds()
+        for path in list_segments(self.directory):
+            if not path.name.endswith(COMPRESSED_SUFFIX):
+                continue
+            index_path = index_path_for(path)
+            try:
+                last_ts = SegmentIndex.load(index_path).last_ts
+            except (OSError, ValueError, KeyError):
+                continue
+            if last_ts is not None and last_ts < cutoff:
+                for stale in (path, index_path):
+                    try:
+                        stale.unlink()
+                    except OSError:
+                        pass
+
+    def _open(self) -> None:
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+        self._seq += 1
+        self._path = self.directory / (
+            f"{stamp}.{int(now * 1000) % 1000:03d}"
+            f"-{self._seq:04d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        )
+        # pylint: disable=consider-using-with
+        self._file = self._path.open("ab")
+        self._index = SegmentIndex()
+        self._size = 0
+        self._opened_at = now
+
+    def _finish(self) -> None:
+        if self._file is None or self._path is None or self._index is None:
+            return
+        self._file.close()
+        path, index = self._path, self._index
+        self._file = self._path = self._index = None
+        if index.count == 0:
+            path.unlink()
+        else:
+            finish_segment(path, index)
+
+    def rotate(self) -> None:
+        self._finish()
+        self.prune()
+        self._open()
+
+    def _should_rotate(self, now: float) -> bool:
+        return (
+            self._size >= self.max_bytes
+            or now - self._opened_at >= self.max_age.total_seconds()
+        )
+
+    def emit(self, record):
+        # pylint: disable=broad-except
+        try:
+            frame = encode(record)
+            if self._file is None:
+                self._open()
+            elif self._should_rotate(record.created):
+                self.rotate()
+            self._file.write(frame)
+            self._size += len(frame)
+            self._index.add(record.created, record.levelno, record.name)
+            if record.levelno >= self.flush_level:
+                self._file.flush()
+        except (KeyboardInterrupt, SystemExit) as error:
+            raise error
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self.lock:
+            # pylint: disable=broad-except
+            try:
+                self._finish()
+            except Exception as error:
+                warn(f"Failed to finish log segment: {error}")
+        super().close()
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
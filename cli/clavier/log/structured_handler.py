@@ -0,0 +1,255 @@
+"""\
+Contains the `StructuredHandler` class.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Dict,
+    Literal,
+    Optional,
+    TextIO,
+)
+import io as _io
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import PurePath
+
+from .. import io
+from .lazy import resolve_data
+
+TStructuredFormat = Literal["logfmt", "json"]
+
+# Rich console markup, like `[holup]...[/holup]`, which we strip from messages
+MARKUP_RE = re.compile(r"\[/?[a-z#@][^\[\]]*\]")
+
+# logfmt values that need quoting
+LOGFMT_QUOTE_RE = re.compile(r'[\s"=\\]')
+
+_EXC_FORMATTER = logging.Formatter()
+
+# Types whose values can't be rich renderables. Checked (exactly -- a subclass
+# could be one) before `clavier.io.is_rich`, a slow runtime protocol check.
+_PLAIN_TYPES = frozenset(
+    (str, int, float, bool, type(None), list, tuple, dict, set, frozenset)
+)
+
+
+def plain(value: Any) -> Any:
+    """\
+    Get a plain version of a value that might be a [rich][] renderable, like
+    the `rich.syntax.Syntax` from `clavier.io.fmt_cmd`. Other values are
+    returned as-is.
+
+    [rich]: https://rich.readthedocs.io/en/stable/
+    """
+    if type(value) in _PLAIN_TYPES or isinstance(value, PurePath):
+        return value
+    if io.is_rich(value):
+        for attr in ("plain", "code"):
+            if isinstance(getattr(value, attr, None), str):
+                return getattr(value, attr)
+        return repr(value)
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """\
+    `json.dumps` `default` that gets (most) anything we log into JSON.
+    """
+    if isinstance(value, PurePath):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    value = plain(value)
+    if isinstance(value, str):
+        return value
+    return repr(value)
+
+
+def message_for(record: logging.LogRecord) -> str:
+    """The log message, formatted and with console markup stripped."""
+    return MARKUP_RE.sub("", record.getMessage())
+
+
+def record_dict(record: logging.LogRecord) -> Dict[str, Any]:
+    """\
+    A `dict` of the useful bits of a `logging.LogRecord`, including the
+    `data` added by `KwdsLogger`.
+    """
+    dct = dict(
+        ts=record.created,
+        level=record.levelname,
+        name=record.name,
+        msg=message_for(record),
+        data=resolve_data(record),
+    )
+    if record.exc_info:
+        dct["exc"] = _EXC_FORMATTER.formatException(record.exc_info)
+    return dct
+
+
+def logfmt_value(value: Any) -> str:
+    """\
+    Examples:
+
+        >>> logfmt_value("plain")
+        'plain'
+        >>> logfmt_value("needs quotes")
+        '"needs quotes"'
+        >>> logfmt_value({"a": [1, 2]})
+        '"{\\\\"a\\\\": [1, 2]}"'
+        >>> logfmt_value(None), logfmt_value(True), logfmt_value(1.5)
+        ('null', 'true', '1.5')
+
+    """
+    if isinstance(value, str):
+        return logfmt_string(value)
+    value = plain(value)
+    if isinstance(value, PurePath):
+        return logfmt_string(str(value))
+    if isinstance(value, str):
+        return logfmt_string(value)
+    return logfmt_string(json.dumps(value, default=json_default))
+
+
+def logfmt_string(string: str) -> str:
+    """A `str` as a logfmt value, quoted if it needs to be."""
+    if string == "" or LOGFMT_QUOTE_RE.search(string):
+        return json.dumps(string)
+    return string
+
+
+class StructuredHandler(logging.Handler):
+    """\
+    A `logging.Handler` that writes one line per record, in [logfmt][] or
+    JSON, straight to a buffered stream. No [rich][] rendering, so it's much
+    cheaper than `RichHandler` -- meant for machines, redirected output and
+    high-volume logging.
+
+    The stream is flushed for records at `flush_level` and above, and when
+    the handler is flushed (at exit, at the latest).
+
+    [logfmt]: https://brandur.org/logfmt
+    [rich]: https://rich.readthedocs.io/en/stable/
+
+    Examples:
+
+        >>> from io import StringIO
+        >>> from clavier.log.kwds_logger import KwdsLogger
+        >>> stream = StringIO()
+        >>> logger = KwdsLogger("doctest")
+        >>> logger.addHandler(StructuredHandler(stream=stream))
+        >>> logger.warning("[holup]Heads up[/holup]", n=1, p=PurePath("/a b"))
+        >>> print(stream.getvalue()) # doctest: +ELLIPSIS
+        ts=... level=WARNING name=doctest msg="Heads up" n=1 p="/a b"
+        <BLANKLINE>
+
+        >>> stream = StringIO()
+        >>> logger.handlers = [StructuredHandler("json", stream=stream)]
+        >>> logger.warning("Heads up", n=1)
+        >>> json.loads(stream.getvalue())["data"]
+        {'n': 1}
+
+    """
+
+    # Buffer size for the stream we open on `stderr`'s file descriptor
+    BUFFER_SIZE = 64 * 1024
+
+    _singletons: Dict[str, StructuredHandler] = {}
+
+    @classmethod
+    def singleton(cls, format: TStructuredFormat) -> StructuredHandler:
+        # pylint: disable=redefined-builtin
+        if format not in cls._singletons:
+            cls._singletons[format] = cls(format)
+        return cls._singletons[format]
+
+    @classmethod
+    def open_stderr(cls) -> TextIO:
+        """\
+        Open a separately (block-) buffered text stream on `stderr`, which
+        Python line-buffers.
+        """
+        # pylint: disable=consider-using-with
+        try:
+            fileno = sys.stderr.fileno()
+        except (AttributeError, _io.UnsupportedOperation):
+            return sys.stderr
+        return open(
+            fileno,
+            "w",
+            buffering=cls.BUFFER_SIZE,
+            encoding="utf-8",
+            errors="backslashreplace",
+            closefd=False,
+        )
+
+    output_format: TStructuredFormat
+    stream: TextIO
+    flush_level: int
+
+    def __init__(
+        self,
+        format: TStructuredFormat = "logfmt",
+        level: int = logging.NOTSET,
+        *,
+        stream: Optional[TextIO] = None,
+        flush_level: int = logging.WARNING,
+    ):
+        # pylint: disable=redefined-builtin
+        super().__init__(level=level)
+        if format not in ("logfmt", "json"):
+            raise ValueError(
+                f"Expected `format` to be 'logfmt' or 'json', given {format!r}"
+            )
+        self.output_format = format
+        self.stream = self.open_stderr() if stream is None else stream
+        self.flush_level = flush_level
+
+    def render(self, record: logging.LogRecord) -> str:
+        if self.output_format == "json":
+            return json.dumps(record_dict(record), default=json_default)
+        return self.render_logfmt(record)
+
+    def render_logfmt(self, record: logging.LogRecord) -> str:
+        created = time.localtime(record.created)
+        parts = [
+            "ts=" + time.strftime("%Y-%m-%dT%H:%M:%S", created)
+            + f".{int(record.msecs):03d}" + time.strftime("%z", created),
+            f"level={record.levelname}",
+            f"name={logfmt_string(record.name)}",
+            f"msg={logfmt_string(message_for(record))}",
+        ]
+        for key, value in resolve_data(record).items():
+            parts.append(f"{key}={logfmt_value(value)}")
+        if record.exc_info:
+            exc = _EXC_FORMATTER.formatException(record.exc_info)
+            parts.append(f"exc={logfmt_value(exc)}")
+        return " ".join(parts)
+
+    def emit(self, record):
+        # pylint: disable=broad-except
+        try:
+            line = self.render(record)
+            with self.lock:
+                self.stream.write(line + "\n")
+                if record.levelno >= self.flush_level:
+                    self.stream.flush()
+        except (KeyboardInterrupt, SystemExit) as error:
+            raise error
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
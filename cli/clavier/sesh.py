@@ -11,6 +11,7 @@ import argparse
 import sys
 
 from . import log as logging, err, io
+from .cfg import CFG
 from .arg_par import ArgumentParser
 
 class Sesh:
@@ -44,6 +45,7 @@ class Sesh:
         return self.parser.is_backtracing(self.pkg_name, self.args)
 
     def setup(self: Sesh, log_level: logging.TLevel) -> Sesh:
+        CFG.refresh_env()
         logging.setup(self.pkg_name, log_level)
         return self
 
@@ -51,6 +53,8 @@ class Sesh:
     def parse(self, log, *args, **kwds) -> Sesh:
         self._args = self.parser.parse_args(*args, **kwds)
         logging.set_level(self.pkg_name, verbosity=self.args.verbose)
+        if self.args.log_format is not None:
+            logging.set_format(self.pkg_name, self.args.log_format)
         log.debug("Parsed arguments", **self._args.__dict__)
         return self
 
@@ -116,4 +120,10 @@ class Sesh:
         return 0
 
     def exec(self):
-        sys.exit(self.run())
+        try:
+            code = self.run()
+        finally:
+            # Make sure anything still queued for a background log handler
+            # gets written before we go
+            logging.flush(self.pkg_name)
+        sys.exit(code)
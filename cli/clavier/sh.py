@@ -1,13 +1,27 @@
+from __future__ import annotations
 from typing import *
+import asyncio
 import os
 from os.path import isabs, basename
+import queue
+import signal
 import subprocess
+import threading
+import time
+from datetime import timedelta
+from io import BufferedReader
 from pathlib import Path
 import json
 from shutil import rmtree
 
+from rich.style import Style
+# Aliased -- `from typing import *` brings in `typing.Text` too
+from rich.text import Text as RichText
+
 from .io import OUT, ERR, fmt, fmt_cmd
 from . import log as logging
+from .cfg import CFG
+from .sh_cache import GetCache
 
 TOpts = Mapping[Any, Any]
 TOptsStyle = Literal["=", " "]
@@ -185,8 +199,81 @@ def prepare(
     return list(flat_args(args, rel_to=rel_to, **opts))
 
 
+# `get` formats that yield items as the command outputs them, rather than
+# returning once it's done
+STREAM_FORMATS = ("lines", "jsonl", "chunks")
+
+# Most `get(..., format="chunks")` reads at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def get_cache() -> Optional[GetCache]:
+    """The `GetCache` configured at `clavier.sh.cache`, if there is one."""
+    config = CFG.clavier.sh.cache
+    if config.dir is None:
+        return None
+    return GetCache(config.dir, ttl=config.ttl, max_bytes=config.max_bytes)
+
+
 # pylint: disable=redefined-builtin
-def get(*args, chdir=None, format=None, encoding="utf-8", **opts) -> Any:
+def _flush_output() -> None:
+    """\
+    Flush our console output and logs, so they come out before anything a
+    child process writes to the same places.
+    """
+    logging.flush_console()
+    for console in (OUT, ERR):
+        console.file.flush()
+
+
+def get(
+    *args,
+    chdir=None,
+    format=None,
+    encoding="utf-8",
+    cache: Union[bool, timedelta] = False,
+    cache_env: Iterable[str] = (),
+    cache_inputs: Iterable[_TPath] = (),
+    **opts,
+) -> Any:
+    """\
+    Run a command and get its output, as a `str` by default, or as per
+    `format`:
+
+    1.  `strip` -- `str`, with surrounding whitespace stripped.
+    2.  `json` -- parsed JSON.
+
+    The `STREAM_FORMATS` return an iterator instead, which yields while the
+    command runs, so memory stays bounded:
+
+    3.  `lines` -- each line, without its ending.
+    4.  `jsonl` -- each (non-blank) line, parsed as JSON.
+    5.  `chunks` -- raw `bytes`, as they're read.
+
+    Stopping early (`close()`, or dropping the iterator) kills the command.
+    A non-zero exit raises `subprocess.CalledProcessError`, after
+    everything has been yielded.
+
+    For commands whose answers rarely change, `cache=True` (or a
+    `timedelta` to use as the TTL) keeps the output in the `get_cache()`
+    between runs. It's re-run when the command, `chdir`, `opts`, the
+    environment variables named in `cache_env` or the files in
+    `cache_inputs` change. Streaming formats are never cached.
+
+    Examples:
+
+        >>> get("echo", "hello", format="strip")
+        'hello'
+        >>> list(get("printf", '{"a": 1}\\n\\n{"a": 2}\\n', format="jsonl"))
+        [{'a': 1}, {'a': 2}]
+
+        Only what's asked for is read:
+
+        >>> from itertools import islice
+        >>> list(islice(get("yes", format="lines"), 3))
+        ['y', 'y', 'y']
+
+    """
     log = LOG.getChild("get")
 
     if isinstance(chdir, Path):
@@ -196,14 +283,41 @@ def get(*args, chdir=None, format=None, encoding="utf-8", **opts) -> Any:
 
     log.debug(
         "Getting system command output...",
-        cmd=fmt_cmd(cmd),
+        cmd=logging.Lazy(fmt_cmd, cmd),
         chdir=chdir,
-        fmt=fmt,
+        format=format,
         encoding=encoding,
         **opts,
     )
-    # https://docs.python.org/3.8/library/subprocess.html#subprocess.run
-    output = subprocess.check_output(cmd, encoding=encoding, cwd=chdir, **opts)
+
+    if format in STREAM_FORMATS:
+        return _get_stream(cmd, chdir, format, encoding, opts)
+
+    store = get_cache() if cache is not False else None
+    key = None
+    output = None
+    if store is not None:
+        key = store.key(
+            cmd,
+            chdir,
+            encoding=encoding,
+            env=cache_env,
+            inputs=cache_inputs,
+            opts=opts,
+        )
+        output = store.load(
+            key, ttl=cache if isinstance(cache, timedelta) else None
+        )
+        log.debug("Cached output", hit=output is not None, key=key)
+
+    if output is None:
+        _flush_output()
+        # https://docs.python.org/3.8/library/subprocess.html#subprocess.run
+        output = subprocess.check_output(
+            cmd, encoding=encoding, cwd=chdir, **opts
+        )
+        if store is not None and key is not None:
+            store.dump(key, output)
 
     if format is None:
         return output
@@ -212,10 +326,56 @@ def get(*args, chdir=None, format=None, encoding="utf-8", **opts) -> Any:
     elif format == "json":
         return json.loads(output)
     else:
-        log.warn("Unknown `format`", format=format, expected=[None, "json"])
+        log.warn(
+            "Unknown `format`",
+            format=format,
+            expected=[None, "strip", "json", *STREAM_FORMATS],
+        )
         return output
 
 
+def _get_stream(
+    cmd: List[str],
+    chdir: Optional[str],
+    format: str,
+    encoding: str,
+    opts: Mapping[str, Any],
+) -> Iterator[Any]:
+    # pylint: disable=consider-using-with
+    text = format != "chunks"
+    _flush_output()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=chdir,
+        stdout=subprocess.PIPE,
+        encoding=encoding if text else None,
+        **opts,
+    )
+    assert proc.stdout is not None
+    try:
+        if format == "chunks":
+            # Binary mode, so a `BufferedReader`
+            stdout = cast(BufferedReader, proc.stdout)
+            while chunk := stdout.read1(CHUNK_SIZE):
+                yield chunk
+        else:
+            for line in proc.stdout:
+                line = line.rstrip("\r\n")
+                if format == "lines":
+                    yield line
+                elif line.strip():
+                    yield json.loads(line)
+        returncode = proc.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+    finally:
+        if proc.poll() is None:
+            # Stopped early -- the rest isn't wanted
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+
 @LOG.inject
 def run(
     log,
@@ -229,6 +389,29 @@ def run(
     rel_paths: bool = False,
     **opts,
 ) -> None:
+    """\
+    Run a command, with its output going where ours goes.
+
+    `input` is fed to its `stdin`, and can be:
+
+    1.  a `Path` -- the open file becomes `stdin`, so it's never read into
+        memory by us;
+    2.  `str` or `bytes` -- `str` is encoded with `encoding`;
+    3.  any other iterable of `str` or `bytes` chunks, like a generator --
+        written as they come, so memory stays bounded.
+
+    Other `opts` go to `subprocess.Popen`, plus `timeout`, as for
+    `subprocess.run`. Output isn't captured, so `capture_output` is refused
+    -- that's what `get` is for.
+
+    Examples:
+
+        >>> run(
+        ...     "sh", "-c", 'test "$(wc -c)" -eq 4096',
+        ...     input=(b"x" * 1024 for _ in range(4)),
+        ... )
+
+    """
     cmd = prepare(
         args,
         opts_style=opts_style,
@@ -243,28 +426,831 @@ def run(
     if log is None:
         log = LOG.getChild("get")
 
+    # pylint: disable=redefined-builtin,consider-using-with
     log.info(
         "Running system command...",
-        cmd=fmt_cmd(cmd),
+        cmd=logging.Lazy(fmt_cmd, cmd),
         chdir=chdir,
         encoding=encoding,
         **opts,
     )
 
-    if isinstance(input, Path):
-        with input.open("r", encoding="utf-8") as file:
-            subprocess.run(
-                cmd,
-                check=check,
-                cwd=chdir,
-                encoding=encoding,
-                input=file.read(),
-                **opts,
+    # `subprocess.run` options, which `Popen` doesn't take
+    if "capture_output" in opts:
+        raise TypeError(
+            "`run` doesn't support `capture_output` -- its output goes where "
+            "ours does; use `get` to capture it"
+        )
+    timeout = opts.pop("timeout", None)
+
+    stdin_file: Optional[BinaryIO] = None
+    stdin: Union[None, int, BinaryIO]
+    if input is None:
+        stdin = None
+    elif isinstance(input, Path):
+        stdin = stdin_file = input.open("rb")
+    else:
+        stdin = subprocess.PIPE
+
+    feeder = None
+    _flush_output()
+    try:
+        with subprocess.Popen(
+            cmd, cwd=chdir, stdin=stdin, encoding=encoding, **opts
+        ) as proc:
+            try:
+                if stdin is subprocess.PIPE:
+                    assert proc.stdin is not None
+                    # On a thread, so `timeout` covers writing too
+                    feeder = threading.Thread(
+                        target=_feed,
+                        args=(_binary(proc.stdin), input, encoding),
+                        daemon=True,
+                    )
+                    feeder.start()
+                returncode = proc.wait(timeout=timeout)
+            except BaseException:
+                proc.kill()
+                raise
+            finally:
+                if feeder is not None:
+                    # Done once the child's gone -- writes get `EPIPE`
+                    feeder.join()
+    finally:
+        if stdin_file is not None:
+            stdin_file.close()
+
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+class BatchResult(NamedTuple):
+    """How one command in a `Batch` went."""
+
+    label: str
+    cmd: List[str]
+    # `None` when the command was cancelled before it started
+    returncode: Optional[int]
+    # Seconds, wall time
+    elapsed: float
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+class _BatchJob(NamedTuple):
+    label: str
+    cmd: List[str]
+    after: Tuple[str, ...]
+    chdir: Optional[str]
+    encoding: str
+    input: Any
+    opts: Mapping[str, Any]
+
+
+class Batch:
+    """\
+    Runs system commands concurrently -- at most `max_workers` at a time,
+    `clavier.sh.batch.max_workers` by default -- with optional dependency
+    edges between them.
+
+    Each line of a command's output (`stdout` and `stderr`) is printed with
+    its label in front. When a command fails, `fail_fast` stops the others
+    (and anything not started yet); otherwise only the commands that depend
+    on it are skipped. Either way, a `subprocess.CalledProcessError` for the
+    command that failed first (not the ones stopped because of it) is raised
+    at the end if `check` is `True`, like `run`.
+
+    Examples:
+
+        >>> batch = Batch(max_workers=2)
+        >>> batch.add("a", "echo", "from a")
+        'a'
+        >>> batch.add("b", "echo", "from b", after=["a"])
+        'b'
+        >>> [(r.label, r.returncode) for r in batch.run()] # doctest: +SKIP
+        [('a', 0), ('b', 0)]
+
+        Dependencies have to be added first, which also rules out cycles:
+
+        >>> batch.add("c", "true", after=["d"])
+        Traceback (most recent call last):
+            ...
+        ValueError: Unknown dependency 'd' for 'c'; add it to the batch first
+
+    """
+
+    max_workers: int
+    fail_fast: bool
+    check: bool
+    log: Any
+    _jobs: Dict[str, _BatchJob]
+
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = None,
+        fail_fast: bool = True,
+        check: bool = True,
+        log=None,
+    ):
+        self.max_workers = max_workers or CFG.clavier.sh.batch.max_workers
+        self.fail_fast = fail_fast
+        self.check = check
+        self.log = LOG.getChild("Batch") if log is None else log
+        self._jobs = {}
+
+    def add(
+        self,
+        label: str,
+        *args,
+        after: Iterable[str] = (),
+        chdir: Union[None, Path, str] = None,
+        encoding: str = "utf-8",
+        input=None,
+        opts_style: TOptsStyle = DEFAULT_OPTS_STYLE,
+        opts_sort: bool = DEFAULT_OPTS_SORT,
+        rel_paths: bool = False,
+        **opts,
+    ) -> str:
+        """\
+        Add a command, taking the same arguments as `run`. It starts after
+        the commands labeled in `after` succeed. Returns the label.
+        """
+        if label in self._jobs:
+            raise ValueError(f"Label {label!r} is already in the batch")
+        after = tuple(after)
+        for dep in after:
+            if dep not in self._jobs:
+                raise ValueError(
+                    f"Unknown dependency {dep!r} for {label!r}; add it to "
+                    "the batch first"
+                )
+        cmd = prepare(
+            args,
+            opts_style=opts_style,
+            opts_sort=opts_sort,
+            chdir=chdir,
+            rel_paths=rel_paths,
+        )
+        self._jobs[label] = _BatchJob(
+            label=label,
+            cmd=cmd,
+            after=after,
+            chdir=(None if chdir is None else str(chdir)),
+            encoding=encoding,
+            input=input,
+            opts=opts,
+        )
+        return label
+
+    def __enter__(self) -> Batch:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.run()
+
+    def _print(self, prefix: RichText, line: str) -> None:
+        OUT.print(
+            RichText.assemble(prefix, line.rstrip("\n")),
+            highlight=False,
+            soft_wrap=True,
+        )
+
+    def _execute(
+        self,
+        job: _BatchJob,
+        prefix: RichText,
+        procs: Dict[str, subprocess.Popen],
+        procs_lock: threading.Lock,
+        stopping: threading.Event,
+        done: "queue.Queue[BatchResult]",
+    ):
+        # pylint: disable=broad-except,consider-using-with
+        start = time.monotonic()
+        returncode: Optional[int] = None
+        stdin_file: Optional[BinaryIO] = None
+        stdin: Union[int, BinaryIO]
+        try:
+            # Something failed since this was scheduled -- don't start
+            if stopping.is_set():
+                return
+            if isinstance(job.input, Path):
+                stdin = stdin_file = job.input.open("rb")
+            elif job.input is None:
+                stdin = subprocess.DEVNULL
+            else:
+                stdin = subprocess.PIPE
+            proc = subprocess.Popen(
+                job.cmd,
+                cwd=job.chdir,
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                encoding=job.encoding,
+                errors="replace",
+                **job.opts,
+            )
+            # Registered under the lock `run` stops everything with, so this
+            # is either in `procs` for the sweep or sees `stopping` here
+            with procs_lock:
+                procs[job.label] = proc
+                if stopping.is_set():
+                    proc.terminate()
+            if stdin == subprocess.PIPE:
+                assert proc.stdin is not None
+                threading.Thread(
+                    target=_feed,
+                    # Past the text layer -- `_feed` writes `bytes`
+                    args=(_binary(proc.stdin), job.input, job.encoding),
+                    daemon=True,
+                ).start()
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                self._print(prefix, line)
+            returncode = proc.wait()
+        except Exception as error:
+            self._print(prefix, f"{type(error).__name__}: {error}")
+            returncode = -1
+        finally:
+            if stdin_file is not None:
+                stdin_file.close()
+            done.put(
+                BatchResult(
+                    job.label, job.cmd, returncode, time.monotonic() - start
+                )
+            )
+
+    def run(self) -> List[BatchResult]:
+        """\
+        Run everything that's been added, returning results in the order the
+        commands were added.
+        """
+        jobs = self._jobs
+        width = max((len(label) for label in jobs), default=0)
+        prefixes = {
+            label: RichText(f"{label.ljust(width)} │ ", style=Style(dim=True))
+            for label in jobs
+        }
+
+        pending = dict(jobs)
+        running: Set[str] = set()
+        results: Dict[str, BatchResult] = {}
+        # The first command to fail, as opposed to those stopped after it
+        failure: Optional[BatchResult] = None
+        procs: Dict[str, subprocess.Popen] = {}
+        procs_lock = threading.Lock()
+        done: "queue.Queue[BatchResult]" = queue.Queue()
+        stopping = threading.Event()
+        start = time.monotonic()
+
+        while pending or running:
+            for label, job in list(pending.items()):
+                failed_deps = [
+                    dep
+                    for dep in job.after
+                    if dep in results and not results[dep].ok
+                ]
+                if stopping.is_set() or failed_deps:
+                    del pending[label]
+                    results[label] = BatchResult(label, job.cmd, None, 0.0)
+                    continue
+                if len(running) >= self.max_workers:
+                    continue
+                if all(dep in results for dep in job.after):
+                    del pending[label]
+                    running.add(label)
+                    self.log.info(
+                        "Running system command...",
+                        label=label,
+                        cmd=logging.Lazy(fmt_cmd, job.cmd),
+                        chdir=job.chdir,
+                    )
+                    _flush_output()
+                    threading.Thread(
+                        target=self._execute,
+                        args=(
+                            job,
+                            prefixes[label],
+                            procs,
+                            procs_lock,
+                            stopping,
+                            done,
+                        ),
+                        name=f"{__name__}.Batch[{label}]",
+                        daemon=True,
+                    ).start()
+
+            if not running:
+                continue
+
+            result = done.get()
+            running.discard(result.label)
+            with procs_lock:
+                procs.pop(result.label, None)
+            results[result.label] = result
+            if failure is None and result.returncode not in (None, 0):
+                failure = result
+
+            if not result.ok and self.fail_fast and not stopping.is_set():
+                with procs_lock:
+                    stopping.set()
+                    for proc in procs.values():
+                        if proc.poll() is None:
+                            proc.terminate()
+
+        ordered = [results[label] for label in jobs]
+        self.log.info(
+            "Batch finished",
+            elapsed=f"{time.monotonic() - start:.2f}s",
+            timings={
+                result.label: (
+                    "cancelled"
+                    if result.returncode is None
+                    else f"{result.elapsed:.2f}s "
+                    + ("ok" if result.ok else f"exit {result.returncode}")
+                )
+                for result in ordered
+            },
+        )
+
+        if self.check and failure is not None:
+            assert failure.returncode is not None
+            raise subprocess.CalledProcessError(
+                failure.returncode, failure.cmd
             )
+        return ordered
+
+
+# Size of the chunks `_input_chunks` cuts `str` and `bytes` inputs into
+INPUT_CHUNK_SIZE = 64 * 1024
+
+
+def _input_chunks(
+    input, encoding: Optional[str]
+) -> Iterator[Union[bytes, bytearray]]:
+    """\
+    Encoded chunks of an `input` that's `str`, `bytes` or an iterable of
+    either. `str` is encoded as UTF-8 when `encoding` is `None` (binary mode).
+
+    Examples:
+
+        >>> list(_input_chunks("hi", "utf-8"))
+        [b'hi']
+        >>> list(_input_chunks(iter(["a", b"b", "c"]), "utf-8"))
+        [b'a', b'b', b'c']
+
+    """
+    # pylint: disable=redefined-builtin
+    encoding = encoding or "utf-8"
+    if isinstance(input, str):
+        input = input.encode(encoding)
+    if isinstance(input, (bytes, bytearray)):
+        for start in range(0, len(input), INPUT_CHUNK_SIZE):
+            yield input[start : start + INPUT_CHUNK_SIZE]
+        return
+    for chunk in input:
+        yield chunk.encode(encoding) if isinstance(chunk, str) else chunk
+
+
+def _binary(stream: IO[Any]) -> BinaryIO:
+    """The binary stream under `stream`, if it's a text-mode pipe."""
+    return cast(BinaryIO, getattr(stream, "buffer", stream))
+
+
+def _feed(stdin: BinaryIO, input, encoding: Optional[str]) -> None:
+    # pylint: disable=redefined-builtin
+    try:
+        for chunk in _input_chunks(input, encoding):
+            stdin.write(chunk)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def run_many(
+    commands: Mapping[str, Sequence],
+    *,
+    after: Optional[Mapping[str, Iterable[str]]] = None,
+    max_workers: Optional[int] = None,
+    fail_fast: bool = True,
+    check: bool = True,
+    log=None,
+    **opts,
+) -> List[BatchResult]:
+    """\
+    Run `commands` -- a mapping of labels to `run` arguments -- concurrently
+    with a `Batch`. `after` maps labels to the labels they depend on, and
+    `opts` go to every command.
+    """
+    after = after or {}
+    batch = Batch(
+        max_workers=max_workers, fail_fast=fail_fast, check=check, log=log
+    )
+    for label, args in commands.items():
+        batch.add(label, *args, after=after.get(label, ()), **opts)
+    return batch.run()
+
+
+# Async
+# ============================================================================
+#
+# `asyncio` counterparts of `run` and `get`, plus `astream` to iterate over
+# output line by line, so shell work can overlap with other I/O in one
+# process.
+#
+
+# Longest line `astream` will read (`asyncio`'s default is 64 KiB)
+STREAM_LIMIT = 1024 * 1024
+
+# Lines `astream` will hold when both `stdout` and `stderr` are streamed;
+# beyond that the child blocks on its pipes
+STREAM_QUEUE_SIZE = 64
+
+TStreamName = Literal["stdout", "stderr"]
+
+
+class StreamLine(NamedTuple):
+    """A line of output from `astream`, without the line ending."""
+
+    stream: TStreamName
+    line: str
+
+
+def _stdin_for(input) -> Tuple[Any, Optional[IO]]:
+    """\
+    The `stdin` argument for an `input` -- `None`, a `Path` to read, or
+    something for `_input_chunks` to write -- and the file to close
+    afterwards, if one was opened.
+    """
+    # pylint: disable=redefined-builtin,consider-using-with
+    if input is None:
+        return None, None
+    if isinstance(input, Path):
+        file = input.open("rb")
+        return file, file
+    return asyncio.subprocess.PIPE, None
+
+
+async def _awrite(proc, input, encoding: str) -> None:
+    # pylint: disable=redefined-builtin
+    try:
+        for chunk in _input_chunks(input, encoding):
+            proc.stdin.write(chunk)
+            await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        proc.stdin.close()
+
+
+async def arun(
+    *args,
+    chdir: Union[None, Path, str] = None,
+    check: bool = True,
+    encoding: str = "utf-8",
+    input=None,
+    opts_style: TOptsStyle = DEFAULT_OPTS_STYLE,
+    opts_sort: bool = DEFAULT_OPTS_SORT,
+    rel_paths: bool = False,
+    log=None,
+    **opts,
+) -> int:
+    """\
+    Like `run`, but `async`. Returns the exit status. The command runs in its
+    own session, and if this is cancelled, it's killed along with anything
+    it started.
+
+    Examples:
+
+        >>> import asyncio
+        >>> asyncio.run(arun("true"))
+        0
+
+    """
+    # pylint: disable=redefined-builtin
+    cmd = prepare(
+        args,
+        opts_style=opts_style,
+        opts_sort=opts_sort,
+        chdir=chdir,
+        rel_paths=rel_paths,
+    )
+
+    if isinstance(chdir, Path):
+        chdir = str(chdir)
+
+    if log is None:
+        log = LOG.getChild("arun")
+
+    log.info(
+        "Running system command...",
+        cmd=logging.Lazy(fmt_cmd, cmd),
+        chdir=chdir,
+        encoding=encoding,
+        **opts,
+    )
+
+    stdin, stdin_file = _stdin_for(input)
+    proc = None
+    done = False
+    _flush_output()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=chdir,
+            stdin=stdin,
+            # So `_akill` can get anything it starts, too
+            start_new_session=True,
+            **opts,
+        )
+        if stdin is asyncio.subprocess.PIPE:
+            await _awrite(proc, input, encoding)
+        returncode = await proc.wait()
+        done = True
+    finally:
+        if proc is not None and not done:
+            # Cancelled (or blew up) -- don't leave the child behind
+            await _akill(proc)
+        if stdin_file is not None:
+            stdin_file.close()
+
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
+
+
+async def aget(
+    *args,
+    chdir: Union[None, Path, str] = None,
+    format=None,
+    encoding: str = "utf-8",
+    input=None,
+    opts_style: TOptsStyle = DEFAULT_OPTS_STYLE,
+    opts_sort: bool = DEFAULT_OPTS_SORT,
+    rel_paths: bool = False,
+    **opts,
+) -> Any:
+    """\
+    Like `get`, but `async`. The command runs in its own session, and if
+    this is cancelled, it's killed along with anything it started.
+
+    Examples:
+
+        >>> import asyncio
+        >>> asyncio.run(aget("echo", "hello", format="strip"))
+        'hello'
+        >>> asyncio.run(aget("echo", '{"a": 1}', format="json"))
+        {'a': 1}
+
+    """
+    # pylint: disable=redefined-builtin
+    log = LOG.getChild("aget")
+
+    cmd = prepare(
+        args,
+        opts_style=opts_style,
+        opts_sort=opts_sort,
+        chdir=chdir,
+        rel_paths=rel_paths,
+    )
+
+    if isinstance(chdir, Path):
+        chdir = str(chdir)
+
+    log.debug(
+        "Getting system command output...",
+        cmd=logging.Lazy(fmt_cmd, cmd),
+        chdir=chdir,
+        format=format,
+        encoding=encoding,
+        **opts,
+    )
+
+    stdin, stdin_file = _stdin_for(input)
+    proc = None
+    writer = None
+    done = False
+    _flush_output()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=chdir,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            # So `_akill` can get anything it starts, too
+            start_new_session=True,
+            **opts,
+        )
+        if stdin is asyncio.subprocess.PIPE:
+            writer = asyncio.create_task(_awrite(proc, input, encoding))
+        assert proc.stdout is not None
+        output_bytes = await proc.stdout.read()
+        if writer is not None:
+            await writer
+        returncode = await proc.wait()
+        done = True
+    finally:
+        if writer is not None:
+            writer.cancel()
+        if proc is not None and not done:
+            # Cancelled (or blew up) -- don't leave the child behind
+            await _akill(proc)
+        if stdin_file is not None:
+            stdin_file.close()
+
+    output = output_bytes.decode(encoding)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output)
+
+    if format is None:
+        return output
+    elif format == "strip":
+        return output.strip()
+    elif format == "json":
+        return json.loads(output)
     else:
-        subprocess.run(
-            cmd, check=check, cwd=chdir, encoding=encoding, input=input, **opts
+        log.warn("Unknown `format`", format=format, expected=[None, "json"])
+        return output
+
+
+async def _akill(proc: asyncio.subprocess.Process) -> None:
+    """\
+    Kill a child started with `start_new_session=True` -- and, through its
+    process group, anything it started, which could otherwise keep its pipes
+    (and so `wait`) open -- then wait for it.
+    """
+    if proc.stdin is not None:
+        proc.stdin.close()
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+async def _read_lines(
+    name: TStreamName, reader, encoding: str, lines: asyncio.Queue
+) -> None:
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            # Waits while the queue is full -- that's the backpressure
+            await lines.put(
+                StreamLine(name, line.decode(encoding).rstrip("\r\n"))
+            )
+    except Exception:
+        # Still mark the end, so `astream` isn't left waiting for it
+        await lines.put(None)
+        raise
+    # Not when cancelled: `astream` has stopped reading, so the queue might
+    # never have room
+    await lines.put(None)
+
+
+async def astream(
+    *args,
+    chdir: Union[None, Path, str] = None,
+    check: bool = True,
+    encoding: str = "utf-8",
+    input=None,
+    stderr: Literal["inherit", "merge", "stream", "devnull"] = "inherit",
+    opts_style: TOptsStyle = DEFAULT_OPTS_STYLE,
+    opts_sort: bool = DEFAULT_OPTS_SORT,
+    rel_paths: bool = False,
+    log=None,
+    **opts,
+) -> AsyncIterator[StreamLine]:
+    """\
+    Run a command and iterate over its output as `StreamLine`s, as it comes.
+
+    `stderr` is one of:
+
+    1.  `inherit` -- goes where ours goes (default).
+    2.  `merge` -- into `stdout`, so lines are yielded as `stdout`.
+    3.  `stream` -- yielded as `stderr` lines, interleaved with `stdout`.
+    4.  `devnull` -- discarded.
+
+    Output is only read as fast as it's consumed: once the pipe buffers
+    (and, when streaming both, `STREAM_QUEUE_SIZE` lines) are full, the
+    child blocks on writing. The child runs in its own session; if
+    iteration stops early, it's killed along with anything it started.
+    Otherwise, with `check`, a non-zero exit raises
+    `subprocess.CalledProcessError` at the end.
+
+    Examples:
+
+        >>> import asyncio
+        >>> async def collect():
+        ...     return [
+        ...         line async for line in
+        ...         astream("sh", "-c", "echo out; echo err >&2", stderr="merge")
+        ...     ]
+        >>> asyncio.run(collect())
+        [StreamLine(stream='stdout', line='out'), StreamLine(stream='stdout', line='err')]
+
+    """
+    # pylint: disable=redefined-builtin
+    cmd = prepare(
+        args,
+        opts_style=opts_style,
+        opts_sort=opts_sort,
+        chdir=chdir,
+        rel_paths=rel_paths,
+    )
+
+    if isinstance(chdir, Path):
+        chdir = str(chdir)
+
+    if log is None:
+        log = LOG.getChild("astream")
+
+    log.debug(
+        "Streaming system command output...",
+        cmd=logging.Lazy(fmt_cmd, cmd),
+        chdir=chdir,
+        stderr=stderr,
+        encoding=encoding,
+        **opts,
+    )
+
+    stderr_arg = {
+        "inherit": None,
+        "merge": asyncio.subprocess.STDOUT,
+        "stream": asyncio.subprocess.PIPE,
+        "devnull": asyncio.subprocess.DEVNULL,
+    }[stderr]
+
+    stdin, stdin_file = _stdin_for(input)
+    tasks: List[asyncio.Task] = []
+    proc = None
+    done = False
+    _flush_output()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=chdir,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=stderr_arg,
+            limit=STREAM_LIMIT,
+            # So `_akill` can get anything it starts, too
+            start_new_session=True,
+            **opts,
         )
+        assert proc.stdout is not None
+        if stdin is asyncio.subprocess.PIPE:
+            tasks.append(asyncio.create_task(_awrite(proc, input, encoding)))
+
+        if stderr == "stream":
+            assert proc.stderr is not None
+            lines: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+            tasks.append(
+                asyncio.create_task(
+                    _read_lines("stdout", proc.stdout, encoding, lines)
+                )
+            )
+            tasks.append(
+                asyncio.create_task(
+                    _read_lines("stderr", proc.stderr, encoding, lines)
+                )
+            )
+            open_streams = 2
+            while open_streams:
+                item = await lines.get()
+                if item is None:
+                    open_streams -= 1
+                else:
+                    yield item
+        else:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                yield StreamLine(
+                    "stdout", line.decode(encoding).rstrip("\r\n")
+                )
+
+        returncode = await proc.wait()
+        done = True
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if proc is not None and not done:
+            # Stopped early (or blew up) -- don't leave the child behind
+            await _akill(proc)
+        if stdin_file is not None:
+            stdin_file.close()
 
 
 def replace(
@@ -276,8 +1262,6 @@ def replace(
     opts_sort: bool = DEFAULT_OPTS_SORT,
 ) -> NoReturn:
     # https://docs.python.org/3.9/library/os.html#os.execl
-    for console in (OUT, ERR):
-        console.file.flush()
     proc_name = basename(exe)
     cmd = flatten_args((exe, *args), opts_style=opts_style, opts_sort=opts_sort)
     LOG.getChild("exec").debug(
@@ -286,6 +1270,8 @@ def replace(
         env=env,
         chdir=chdir,
     )
+    # Anything still buffered is lost with this process
+    _flush_output()
     if chdir is not None:
         os.chdir(chdir)
     if env is None:
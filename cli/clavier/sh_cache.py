@@ -0,0 +1,218 @@
+"""\
+Defines `GetCache`, which keeps `clavier.sh.get` outputs on disk so repeated
+runs can skip the subprocess.
+"""
+
+from __future__ import annotations
+from typing import (
+    Any,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Union,
+)
+from datetime import timedelta
+from pathlib import Path
+import hashlib
+import json
+import os
+import time
+# Like `clavier.cfg.cache`, a cache that doesn't work is no reason to fail the
+# command -- complain through `warnings` and run it
+from warnings import warn
+
+DEFAULT_TTL = timedelta(hours=1)
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+ENTRY_SUFFIX = ".json"
+
+
+def input_state(path: Union[Path, str]) -> Optional[List[int]]:
+    """\
+    What we key on for an input file: its modification time and size, or
+    `None` when it doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class GetCache:
+    """\
+    `clavier.sh.get` outputs, kept as one JSON file per entry in `dir`.
+
+    Entries are keyed by the command, working directory, `encoding` and any
+    other `opts`, along with the values of the environment variables in `env`
+    and the state (see `input_state`) of the `inputs` files -- change any of
+    those and it's a different entry.
+
+    Entries older than `ttl` are ignored. Hits refresh an entry's
+    modification time, and once the entries add up to more than `max_bytes`
+    the least-recently used are removed.
+
+    Examples:
+
+        >>> import tempfile
+        >>> tmp_dir = tempfile.TemporaryDirectory()
+        >>> cache = GetCache(Path(tmp_dir.name), max_bytes=420)
+
+        >>> key = cache.key(["git", "--version"], None)
+        >>> cache.load(key) is None
+        True
+        >>> cache.dump(key, "git version 2.30.0\\n")
+        >>> cache.load(key)
+        'git version 2.30.0\\n'
+
+        Inputs are part of the key:
+
+        >>> src = Path(tmp_dir.name) / "mix.exs"
+        >>> _ = src.write_text("v1")
+        >>> with_src = cache.key(["mix", "help"], None, inputs=[src])
+        >>> cache.dump(with_src, "help")
+        >>> _ = src.write_text("v2, longer")
+        >>> cache.load(cache.key(["mix", "help"], None, inputs=[src])) is None
+        True
+
+        Least-recently used entries go first when over `max_bytes`:
+
+        >>> cache.load(key)
+        'git version 2.30.0\\n'
+        >>> for n in range(3):
+        ...     cache.dump(cache.key(["echo", str(n)], None), "x" * 50)
+        >>> cache.load(with_src) is None, cache.load(key)
+        (True, 'git version 2.30.0\\n')
+
+        >>> tmp_dir.cleanup()
+
+    """
+
+    # Bump when the entry layout changes, so old entries are ignored
+    FORMAT = 1
+
+    dir: Path
+    ttl: timedelta
+    max_bytes: int
+
+    def __init__(
+        self,
+        dir: Union[Path, str],
+        *,
+        ttl: timedelta = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        # pylint: disable=redefined-builtin
+        self.dir = Path(dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def key(
+        self,
+        cmd: Sequence[Any],
+        chdir: Optional[str],
+        *,
+        encoding: str = "utf-8",
+        env: Iterable[str] = (),
+        inputs: Iterable[Union[Path, str]] = (),
+        opts: Optional[Mapping[str, Any]] = None,
+    ) -> str:
+        parts = [
+            self.FORMAT,
+            [str(arg) for arg in cmd],
+            os.path.abspath(chdir or os.getcwd()),
+            encoding,
+            {name: os.environ.get(name) for name in sorted(env)},
+            [[str(path), input_state(path)] for path in inputs],
+            repr(sorted((opts or {}).items())),
+        ]
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.dir / f"{key}{ENTRY_SUFFIX}"
+
+    def load(
+        self, key: str, ttl: Optional[timedelta] = None
+    ) -> Optional[str]:
+        """\
+        Get the cached output for `key`, or `None` if there isn't one fresher
+        than `ttl` (default `self.ttl`).
+        """
+        if ttl is None:
+            ttl = self.ttl
+        path = self.path_for(key)
+        try:
+            with path.open("r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            warn(f"Failed to read `sh.get` cache entry {path}: {error}")
+            return None
+
+        if (
+            entry.get("format") != self.FORMAT
+            or time.time() - entry["created"] > ttl.total_seconds()
+        ):
+            return None
+
+        try:
+            # Marks it used, for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["output"]
+
+    def dump(self, key: str, output: str) -> None:
+        path = self.path_for(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as file:
+                json.dump(
+                    dict(format=self.FORMAT, created=time.time(), output=output),
+                    file,
+                )
+            os.replace(tmp_path, path)
+        except OSError as error:
+            warn(f"Failed to write `sh.get` cache entry {path}: {error}")
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """\
+        Remove least-recently used entries until they fit in `max_bytes`.
+        """
+        entries = []
+        try:
+            with os.scandir(self.dir) as scan:
+                for entry in scan:
+                    if entry.name.endswith(ENTRY_SUFFIX):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError as error:
+            warn(f"Failed to list `sh.get` cache {self.dir}: {error}")
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as error:
+                warn(f"Failed to remove `sh.get` cache entry {path}: {error}")
+                continue
+            total -= size
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
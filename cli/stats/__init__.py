@@ -3,6 +3,7 @@ from typing import *
 
 from clavier import log as logging, io, Sesh, CFG
 from clavier.arg_par import ArgumentParser
+from clavier.log.kafka_handler import KafkaHandler
 
 import stats.cfg # NEED this! And FIRST!
 from stats import cmd
@@ -10,8 +11,24 @@ from stats import cmd
 LOG = logging.getLogger(__name__)
 
 
+def kafka_log_handler() -> KafkaHandler:
+    kafka_log = CFG.stats.log.kafka
+    return KafkaHandler(
+        kafka_log.topic,
+        CFG.stats.kafka.servers,
+        logging.level_for(kafka_log.level),
+        linger=kafka_log.linger,
+        max_batch_bytes=kafka_log.max_batch_bytes,
+        compression=kafka_log.compression,
+        capacity=kafka_log.capacity,
+        spool=kafka_log.spool,
+    )
+
+
 def run():
     sesh = Sesh(__name__, CFG.stats.paths.cli.root / "README.md", cmd.add_to)
     sesh.setup(CFG.stats.log.level)
+    if CFG.stats.log.kafka.enabled:
+        logging.add_handler(__name__, kafka_log_handler())
     sesh.parse()
     sesh.exec()
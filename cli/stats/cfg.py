@@ -1,56 +1,109 @@
+from typing import List
+from datetime import timedelta
 from pathlib import Path
 
 from clavier import CFG, io
+from clavier.cfg.computed import Computed
 
-with CFG.configure("stats", src=__file__) as stats:
-    stats.name = "stats"
-
-    with stats.configure("log") as log:
-        log.level = "INFO"
-
-    with stats.configure("paths") as paths:
-        paths.repo = Path(__file__).resolve().parents[2]
-        paths.dev = paths.repo / "dev"
-        paths.tmp = paths.repo / "tmp"
-        # paths.cli = paths.repo / "cli"
-        # paths.cli_docs = paths.cli / "docs"
-        paths.umbrella = paths.repo
-        paths.umbrella_build = paths.umbrella / "_build"
-        paths.cortex = paths.umbrella / "apps" / "cortex"
-        paths.cortex_web = paths.umbrella / "apps" / "cortex_web"
-
-        with paths.configure("cli") as cli:
-            cli.root = paths.repo / "cli"
-
-            with cli.configure("docs") as docs:
-                docs.root = cli.root / "docs"
-                docs.build = docs.root / "_build"
-
-        with paths.configure("webpack") as webpack:
-            webpack.hard_source_cache = \
-                paths.cortex_web / "assets" / "node_modules" / ".cache"
-
-    with stats.configure("kafka") as kafka:
-        kafka.host = "localhost"
-        kafka.port = 9091
-        kafka.netloc = f"{kafka.host}:{kafka.port}"
-        kafka.servers = [kafka.netloc]
-        kafka.topic = "events"
-
-    with stats.configure("materialize") as materialize:
-        with materialize.configure("paths") as paths:
-            paths.scripts = stats.paths.dev / "sql" / "materialize"
-
-        with materialize.configure("postgres") as postgres:
-            postgres.username = "materialized"
-            postgres.host = "localhost"
-            postgres.port = 6875
-            postgres.database = "materialize"
-            postgres.url = (
-                "postgres://"
-                f"{postgres.username}@{postgres.host}:{postgres.port}"
-                f"/{postgres.database}"
-            )
-
-with CFG.configure(io.rel, src=__file__) as rel:
-    rel.to = CFG.stats.paths.repo
+# Derived values are `Computed` when read, so they follow environment
+# overrides of their inputs (`STATS_KAFKA_PORT`, etc.). They need to be
+# defined up here, before the cache is loaded, to be un-pickled.
+
+def kafka_netloc(kafka):
+    return f"{kafka.host}:{kafka.port}"
+
+def kafka_servers(kafka):
+    return [kafka.netloc]
+
+def materialize_postgres_url(postgres):
+    return (
+        "postgres://"
+        f"{postgres.username}@{postgres.host}:{postgres.port}"
+        f"/{postgres.database}"
+    )
+
+# Types for values that can't be inferred from what they're set to, used to
+# parse environment overrides. Outside the cached block, so they always apply.
+CFG.declare("stats.kafka.servers", List[str])
+
+# Configuration is cached in the repo's `//tmp` directory; the block below only
+# runs when this file or one of the config's environment overrides has changed
+CACHE = CFG.cache(Path(__file__).parents[2] / "tmp" / "stats.cfg.pickle")
+
+if not CACHE.load():
+    with CFG.configure("stats", src=__file__) as stats:
+        stats.name = "stats"
+
+        with stats.configure("log") as log:
+            log.level = "INFO"
+
+        with stats.configure("paths") as paths:
+            paths.repo = Path(__file__).resolve().parents[2]
+            paths.dev = paths.repo / "dev"
+            paths.tmp = paths.repo / "tmp"
+            # paths.cli = paths.repo / "cli"
+            # paths.cli_docs = paths.cli / "docs"
+            paths.umbrella = paths.repo
+            paths.umbrella_build = paths.umbrella / "_build"
+            paths.cortex = paths.umbrella / "apps" / "cortex"
+            paths.cortex_web = paths.umbrella / "apps" / "cortex_web"
+
+            with paths.configure("cli") as cli:
+                cli.root = paths.repo / "cli"
+
+                with cli.configure("docs") as docs:
+                    docs.root = cli.root / "docs"
+                    docs.build = docs.root / "_build"
+
+            with paths.configure("webpack") as webpack:
+                webpack.hard_source_cache = \
+                    paths.cortex_web / "assets" / "node_modules" / ".cache"
+
+        with stats.configure("kafka") as kafka:
+            kafka.host = "localhost"
+            kafka.port = 9091
+            kafka.netloc = Computed(kafka_netloc)
+            kafka.servers = Computed(kafka_servers)
+            kafka.topic = "events"
+
+        with stats.configure("log", "kafka") as kafka_log:
+            # Ship logs to Kafka, next to the `events` topic, with
+            # `clavier.log.kafka_handler.KafkaHandler`
+            kafka_log.enabled = False
+            kafka_log.topic = "logs"
+            kafka_log.level = "INFO"
+            kafka_log.linger = timedelta(milliseconds=250)
+            kafka_log.max_batch_bytes = 1024 * 1024
+            kafka_log.compression = "gzip"
+            kafka_log.capacity = 10_000
+            # Where batches go while the broker is unreachable
+            kafka_log.spool = stats.paths.tmp / "logs.kafka.spool"
+
+        with stats.configure("materialize") as materialize:
+            with materialize.configure("paths") as paths:
+                paths.scripts = stats.paths.dev / "sql" / "materialize"
+
+            with materialize.configure("postgres") as postgres:
+                postgres.username = "materialized"
+                postgres.host = "localhost"
+                postgres.port = 6875
+                postgres.database = "materialize"
+                postgres.url = Computed(materialize_postgres_url)
+
+    with CFG.configure("clavier.log.sample", src=__file__) as sample:
+        # Commands that log every message they receive
+        sample.loggers = {
+            "stats.cmd.midi.dump": "20/s",
+            "stats.cmd.kafka.consume": "20/s",
+        }
+
+    with CFG.configure("clavier.log.segments", src=__file__) as segments:
+        segments.dir = CFG.stats.paths.tmp / "logs"
+
+    with CFG.configure("clavier.sh.cache", src=__file__) as sh_cache:
+        sh_cache.dir = CFG.stats.paths.tmp / "sh-cache"
+
+    with CFG.configure(io.rel, src=__file__) as rel:
+        rel.to = CFG.stats.paths.repo
+
+    CACHE.dump()
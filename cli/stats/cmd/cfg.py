@@ -1,13 +1,59 @@
-from clavier import sh, log as logging, CFG
+from pathlib import Path
+
+from rich.table import Table
+from rich.pretty import Pretty
+from rich.style import Style
+from rich.text import Text
+
+from clavier import log as logging, io, CFG
 
 LOG = logging.getLogger(__name__)
 
 def add_to(subparsers):
-    subparsers.add_parser(
+    parser = subparsers.add_parser(
         "cfg",
         target=run,
         help="Dump config",
     )
+    parser.add_argument(
+        "-p",
+        "--provenance",
+        action="store_true",
+        help="Show where each value comes from (source file, ENV override)",
+    )
+
+def run(provenance=False):
+    if not provenance:
+        return CFG.to_dict()
+
+    rows = []
+    for key in CFG:
+        prov = CFG.provenance(key)
+        src = prov.update.meta.get("src")
+        rows.append({
+            "key": str(key),
+            "value": prov.value,
+            "src": (None if src is None else io.fmt(Path(src))),
+            "env": prov.env_name,
+        })
+    return ProvenanceView(rows)
+
+class ProvenanceView(io.View):
+    def render_rich(self):
+        table = Table.grid(padding=(0, 2))
+        table.add_column("Key", no_wrap=True)
+        table.add_column("Value", ratio=1, overflow="fold")
+        table.add_column("Source", no_wrap=True)
+
+        for row in self.data:
+            if row["env"] is None:
+                source = Text(str(row["src"]), Style(dim=True))
+            else:
+                source = Text(f"${row['env']}", Style(color="yellow"))
+            table.add_row(
+                Text(row["key"], Style(bold=True)),
+                Pretty(row["value"]),
+                source,
+            )
 
-def run():
-    return CFG.to_dict()
+        self.print(table)
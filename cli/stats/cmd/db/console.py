@@ -13,7 +13,11 @@ def run():
         "mix", "config.get", {"output": "json"},
         ":cortex", "Cortex.Repo",
         format="json",
-        chdir=CFG.stats.paths.UMBRELLA
+        chdir=CFG.stats.paths.umbrella,
+        # `mix` takes seconds to start; the answer only changes with config
+        cache=True,
+        cache_env=("MIX_ENV",),
+        cache_inputs=sorted((CFG.stats.paths.umbrella / "config").glob("**/*.exs")),
     )
 
     sh.replace(
@@ -0,0 +1,12 @@
+from clavier import log as logging
+
+LOG = logging.getLogger(__name__)
+
+
+def add_to(subparsers):
+    parser = subparsers.add_parser(
+        "bench",
+        help="Benchmarks, with results written to JSON for comparing",
+    )
+
+    parser.add_children(__name__, __path__)
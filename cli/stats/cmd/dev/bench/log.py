@@ -0,0 +1,239 @@
+from typing import Any, Dict, Sequence, Union
+from pathlib import Path
+from datetime import datetime
+import json
+import logging as stdlib_logging
+import os
+import platform
+import sys
+import time
+
+from rich.console import Console
+from rich.table import Table
+from rich.text import Text
+
+from clavier import log as logging, io, CFG
+from clavier.log.kwds_logger import KwdsLogger
+from clavier.log.log_getter import LogGetter
+from clavier.log.queued_handler import QueuedHandler
+from clavier.log.rich_handler import RichHandler
+from clavier.log.structured_handler import StructuredHandler
+
+LOG = logging.getLogger(__name__)
+
+FORMAT = 1
+
+DEFAULT_RECORDS = 2_000
+
+HANDLERS = ("null", "rich", "logfmt", "json", "queued")
+PAYLOADS = ("none", "small", "large")
+LEVELS = ("enabled", "disabled")
+GETTERS = ("log_getter", "raw")
+
+# `rich` lays out every record, so it gets fewer of them to keep runs short
+RECORDS_DIVISOR = dict(rich=10)
+
+
+def add_to(subparsers):
+    parser = subparsers.add_parser(
+        "logging",
+        target=run,
+        help="Benchmark `clavier.log` throughput and emit latency",
+        view=View,
+    )
+    parser.add_argument(
+        "-n",
+        "--records",
+        type=int,
+        default=DEFAULT_RECORDS,
+        help="Records to log per scenario",
+    )
+    parser.add_argument(
+        "--handler",
+        action="append",
+        choices=HANDLERS,
+        help="Only these handlers (repeatable; default all)",
+    )
+    parser.add_argument(
+        "--payload",
+        action="append",
+        choices=PAYLOADS,
+        help="Only these `data` payload sizes (repeatable; default all)",
+    )
+    parser.add_argument(
+        "-o",
+        "--out",
+        type=Path,
+        help="JSON results file (default under `//tmp/bench`)",
+    )
+
+
+def payload_for(name: str) -> Dict[str, Any]:
+    if name == "none":
+        return {}
+    if name == "small":
+        return dict(port="IAC Driver Bus 1", clock=1234.5678, message=[144, 60, 100])
+    if name == "large":
+        return dict(
+            keys=[f"event.properties.key_{i}" for i in range(500)],
+            record={f"field_{i}": {"value": i, "tags": ["a", "b"]} for i in range(200)},
+        )
+    raise ValueError(f"Unknown payload {name!r}")
+
+
+def handler_for(name: str, devnull) -> stdlib_logging.Handler:
+    if name == "null":
+        return stdlib_logging.NullHandler()
+    if name == "rich":
+        console = Console(file=devnull, width=120, force_terminal=True)
+        return RichHandler(consoles=dict(out=console, err=console))
+    if name == "logfmt":
+        return StructuredHandler("logfmt", stream=devnull)
+    if name == "json":
+        return StructuredHandler("json", stream=devnull)
+    if name == "queued":
+        return QueuedHandler(StructuredHandler("logfmt", stream=devnull))
+    raise ValueError(f"Unknown handler {name!r}")
+
+
+def percentile(sorted_values: Sequence[int], fraction: float) -> int:
+    """\
+    Examples:
+
+        >>> percentile(list(range(1, 101)), 0.5), percentile(list(range(1, 101)), 0.99)
+        (50, 99)
+
+    """
+    index = max(0, int(round(fraction * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def bench_one(
+    handler_name: str,
+    payload_name: str,
+    level_name: str,
+    getter_name: str,
+    records: int,
+    devnull,
+) -> Dict[str, Any]:
+    name = f"{__name__}.{handler_name}.{payload_name}.{level_name}.{getter_name}"
+    getter = LogGetter(name)
+    logger = getter._logger
+    if not isinstance(logger, KwdsLogger):
+        raise RuntimeError(
+            f"Expected a KwdsLogger, got {type(logger)} -- was `setup()` run?"
+        )
+    handler = handler_for(handler_name, devnull)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(stdlib_logging.INFO)
+
+    target: Union[LogGetter, KwdsLogger] = (
+        getter if getter_name == "log_getter" else logger
+    )
+    enabled = level_name == "enabled"
+    data = payload_for(payload_name)
+    latencies = [0] * records
+    clock = time.perf_counter_ns
+
+    try:
+        start = clock()
+        for index in range(records):
+            t_0 = clock()
+            # Looked up each time, as in real use -- that's the `LogGetter`
+            # cost we're after
+            if enabled:
+                target.info("Benchmark record %d", index, **data)
+            else:
+                target.debug("Benchmark record %d", index, **data)
+            latencies[index] = clock() - t_0
+        # Queued handlers aren't done until the queue is drained
+        handler.flush()
+        elapsed = clock() - start
+    finally:
+        logger.handlers = []
+        handler.close()
+
+    latencies.sort()
+    return dict(
+        handler=handler_name,
+        payload=payload_name,
+        level=level_name,
+        getter=getter_name,
+        records=records,
+        records_per_sec=records / (elapsed / 1e9),
+        p50_us=percentile(latencies, 0.50) / 1e3,
+        p99_us=percentile(latencies, 0.99) / 1e3,
+    )
+
+
+def default_out() -> Path:
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+    return CFG.stats.paths.tmp / "bench" / f"logging-{stamp}.json"
+
+
+def run(records=DEFAULT_RECORDS, handler=None, payload=None, out=None):
+    handlers = handler or HANDLERS
+    payloads = payload or PAYLOADS
+    out = default_out() if out is None else out
+
+    results = []
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for handler_name in handlers:
+            count = max(1, records // RECORDS_DIVISOR.get(handler_name, 1))
+            for payload_name in payloads:
+                for level_name in LEVELS:
+                    for getter_name in GETTERS:
+                        LOG.debug(
+                            "Running scenario...",
+                            handler=handler_name,
+                            payload=payload_name,
+                            level=level_name,
+                            getter=getter_name,
+                        )
+                        results.append(
+                            bench_one(
+                                handler_name,
+                                payload_name,
+                                level_name,
+                                getter_name,
+                                count,
+                                devnull,
+                            )
+                        )
+
+    report = dict(
+        format=FORMAT,
+        created_at=datetime.now().astimezone().isoformat(),
+        python=sys.version,
+        platform=platform.platform(),
+        results=results,
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open("w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    LOG.info("[yeah]Wrote benchmark results.[/yeah]", path=out)
+
+    return View(report)
+
+
+class View(io.View):
+    def render_rich(self):
+        table = Table(box=None, padding=(0, 2))
+        for header in ("Handler", "Payload", "Level", "Getter"):
+            table.add_column(header, no_wrap=True)
+        for header in ("Records/sec", "p50 µs", "p99 µs"):
+            table.add_column(header, justify="right", no_wrap=True)
+
+        for row in self.data["results"]:
+            table.add_row(
+                row["handler"],
+                row["payload"],
+                row["level"],
+                row["getter"],
+                Text(f"{row['records_per_sec']:,.0f}", style="bold"),
+                f"{row['p50_us']:.1f}",
+                f"{row['p99_us']:.1f}",
+            )
+
+        self.print(table)
@@ -54,8 +54,10 @@ def run(
 
     exclude = ["setup.py"]
 
-    sh.run(
-        log,
+    batch = sh.Batch(log=log)
+
+    batch.add(
+        "apidoc",
         "sphinx-apidoc",
         {
             "output-dir": paths.cli.docs.root,
@@ -72,7 +74,12 @@ def run(
         rel_paths=True,
     )
 
-    sh.run(log, "make", "html", chdir=paths.cli.docs.root)
+    # `make html` builds from the `.rst` files `sphinx-apidoc` writes
+    batch.add(
+        "html", "make", "html", chdir=paths.cli.docs.root, after=["apidoc"]
+    )
+
+    batch.run()
 
     if serve is True:
         if open is True:
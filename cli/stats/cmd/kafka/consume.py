@@ -1,11 +1,15 @@
 import json
+import threading
 
 from kafka import KafkaConsumer
 
-from clavier import log as logging
+from clavier import log as logging, CFG
 
 LOG = logging.getLogger(__name__)
 
+# How long to wait for records before checking for config changes
+POLL_TIMEOUT_MS = 1000
+
 
 def add_to(subparsers):
     parser = subparsers.add_parser(
@@ -16,17 +20,53 @@ def add_to(subparsers):
     parser.add_argument(
         "-t",
         "--topic",
-        default="events",
-        help="Kafka topic to consume",
+        help=(
+            "Kafka topic to consume. Defaults to the `stats.kafka.topic`\n"
+            "config value, following changes to it while running."
+        ),
     )
 
 
-def run(topic):
+def run(topic=None):
+    # Long-running, so keep the logs around in segment files too
+    logging.add_segment_handler(__name__)
+
+    # Config changes are noticed on the watcher thread, but the consumer is
+    # not thread-safe, so they're handed over here and applied in the loop
+    pending = {}
+    pending_lock = threading.Lock()
+
+    def on_change(key, value):
+        # Removed keys come through as `None` -- keep what we have
+        if value is not None:
+            with pending_lock:
+                pending[key] = value
+
+    CFG.watch("stats.log.level", on_change)
+
+    if topic is None:
+        topic = CFG.stats.kafka.topic
+        CFG.watch("stats.kafka.topic", on_change)
+
     consumer = KafkaConsumer(
         topic,
-        bootstrap_servers=["localhost:9091"],
+        bootstrap_servers=CFG.stats.kafka.servers,
         value_deserializer=json.loads,
         auto_offset_reset="earliest",
     )
-    for record in consumer:
-        LOG.info("Consumed record", **record._asdict())
+
+    while True:
+        with pending_lock:
+            changes = dict(pending)
+            pending.clear()
+
+        for key, value in changes.items():
+            if str(key) == "stats.kafka.topic":
+                LOG.info("[holup]Switching topic...[/holup]", topic=value)
+                consumer.subscribe([value])
+            else:
+                logging.set_pkg_level(__name__, value)
+
+        for records in consumer.poll(timeout_ms=POLL_TIMEOUT_MS).values():
+            for record in records:
+                LOG.info("Consumed record", **record._asdict())
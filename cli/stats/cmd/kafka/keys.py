@@ -32,14 +32,16 @@ def iter_key_paths(dct: Dict, /, key_path=tuple()):
 
 
 def run(event_type):
+    kafka = CFG.freeze().stats.kafka
+
     consumer = KafkaConsumer(
-        CFG.stats.kafka.topic,
-        bootstrap_servers=CFG.stats.kafka.servers,
+        kafka.topic,
+        bootstrap_servers=kafka.servers,
         value_deserializer=json.loads,
         auto_offset_reset="earliest",
     )
 
-    partition = TopicPartition(CFG.stats.kafka.topic, 0)
+    partition = TopicPartition(kafka.topic, 0)
 
     beginning_offsets = consumer.beginning_offsets([partition])
     beginning_offset = beginning_offsets[partition]
@@ -0,0 +1,11 @@
+from clavier import log as logging
+
+LOG = logging.getLogger(__name__)
+
+def add_to(subparsers):
+    parser = subparsers.add_parser(
+        "logs",
+        help="Structured logs kept in segment files (`clavier.log.segments`)",
+    )
+
+    parser.add_children(__name__, __path__)
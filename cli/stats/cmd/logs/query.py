@@ -0,0 +1,122 @@
+from datetime import datetime
+import time
+
+from rich.table import Table
+from rich.pretty import Pretty
+from rich.style import Style
+from rich.text import Text
+
+from clavier import log as logging, io, err, CFG
+from clavier.cfg.schema import coerce_duration
+from clavier.log.segments import query
+
+LOG = logging.getLogger(__name__)
+
+def add_to(subparsers):
+    parser = subparsers.add_parser(
+        "query",
+        target=run,
+        help="Query records kept in log segment files",
+    )
+    parser.add_argument(
+        "-s",
+        "--since",
+        help=(
+            "Only records since this long ago (like `90s`, `2h` or `1h30m`), "
+            "or since an ISO 8601 date-time"
+        ),
+    )
+    parser.add_argument(
+        "-l",
+        "--level",
+        default="NOTSET",
+        help="Only records at this level and above (like `info` or `20`)",
+    )
+    parser.add_argument(
+        "-g",
+        "--logger",
+        help="Only records from this logger and its children",
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        help="Directory of segment files (default `clavier.log.segments.dir`)",
+    )
+
+def since_ts(since):
+    """\
+    Examples:
+
+        >>> abs(since_ts("1h") - (time.time() - 3600)) < 1
+        True
+        >>> since_ts("2021-03-04T05:06:07+00:00")
+        1614834367.0
+        >>> since_ts(None) is None
+        True
+
+    """
+    if since is None:
+        return None
+    try:
+        return time.time() - coerce_duration(since).total_seconds()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(since).timestamp()
+    except ValueError as error:
+        raise err.UserError(
+            "Expected `--since` to be a duration like `2h` or an ISO 8601 "
+            f"date-time, given {since!r}"
+        ) from error
+
+def run(since=None, level="NOTSET", logger=None, dir=None):
+    # pylint: disable=redefined-builtin
+    directory = CFG.clavier.log.segments.dir if dir is None else dir
+    if directory is None:
+        raise err.UserError(
+            "No log segment directory; give `--dir` or set "
+            "`clavier.log.segments.dir`"
+        )
+
+    rows = list(
+        query(
+            directory,
+            since=since_ts(since),
+            level=logging.level_for(level),
+            logger=logger,
+        )
+    )
+    LOG.debug("Queried log segments", directory=directory, count=len(rows))
+    return QueryView(rows)
+
+class QueryView(io.View):
+    def render_rich(self):
+        table = Table.grid(padding=(0, 1))
+        table.add_column(style=Style(dim=True), no_wrap=True)
+        table.add_column(width=8)
+        table.add_column(style=Style(color="blue", dim=True), no_wrap=True)
+        table.add_column(ratio=1, overflow="fold")
+
+        for row in self.data:
+            ts = datetime.fromtimestamp(row["ts"]).isoformat(
+                sep=" ", timespec="milliseconds"
+            )
+            msg = Text(row["msg"])
+            if row["data"]:
+                msg = Table.grid(padding=(0, 1))
+                msg.add_column()
+                msg.add_row(Text(row["msg"]))
+                msg.add_row(Pretty(row["data"]))
+            table.add_row(
+                ts,
+                Text(
+                    row["level"],
+                    style=f"logging.level.{row['level'].lower()}",
+                ),
+                row["name"],
+                msg,
+            )
+            if "exc" in row:
+                table.add_row(None, None, None, Text(row["exc"], Style(dim=True)))
+
+        self.print(table)
@@ -10,26 +10,25 @@ def add_to(subparsers):
     )
 
 
-def run():
-    views_dir = CFG.stats.paths.DEV / "sql" / "materialize" / "views"
+# Each view's script, and the ones it selects from. Views that don't depend on
+# each other are created concurrently.
+VIEWS = {
+    "events_bytes": (),
+    "events": ("events_bytes",),
+    "substack_subscriber_events": ("events",),
+}
 
-    sh.run(
-        "psql",
-        CFG.stats.materialize.postgres.url,
-        text=True,
-        input=(views_dir / "events_bytes.sql"),
-    )
 
-    sh.run(
-        "psql",
-        CFG.stats.materialize.postgres.url,
-        text=True,
-        input=(views_dir / "events.sql"),
-    )
+def run():
+    stats = CFG.freeze().stats
+    views_dir = stats.paths.dev / "sql" / "materialize" / "views"
 
-    sh.run(
-        "psql",
-        CFG.stats.materialize.postgres.url,
-        text=True,
-        input=(views_dir / "substack_subscriber_events.sql"),
-    )
+    with sh.Batch() as batch:
+        for view, after in VIEWS.items():
+            batch.add(
+                view,
+                "psql",
+                stats.materialize.postgres.url,
+                after=after,
+                input=(views_dir / f"{view}.sql"),
+            )
@@ -3,7 +3,7 @@ import time
 
 from rtmidi.midiutil import open_midiinput
 
-from clavier import log as logging
+from clavier import log as logging, CFG
 
 LOG = logging.getLogger(__name__)
 
@@ -45,6 +45,9 @@ def add_to(subparsers):
 
 
 def run(port):
+    # Long-running, so keep the logs around in segment files too
+    logging.add_segment_handler(__name__)
+
     LOG.info("[holup]Opening MIDI port...[/holup]", port=port)
     midi_in, port_name = open_midiinput(port)
 
@@ -54,6 +57,15 @@ def run(port):
     )
     midi_in.set_callback(MidiInputHandler(port_name))
 
+    # Pick up log level changes in the config without having to re-open the
+    # port
+    def on_level_change(_key, level):
+        # Removed keys come through as `None` -- keep the level we have
+        if level is not None:
+            logging.set_pkg_level(__name__, level)
+
+    unwatch = CFG.watch("stats.log.level", on_level_change)
+
     LOG.info("[holup]Entering main loop. Press Control-C to exit...[/holup]")
     try:
         # Just wait for keyboard interrupt,
@@ -63,6 +75,7 @@ def run(port):
     except KeyboardInterrupt:
         print()
     finally:
+        unwatch()
         LOG.info("[holup]Exiting...[/holup]")
         midi_in.close_port()
         del midi_in